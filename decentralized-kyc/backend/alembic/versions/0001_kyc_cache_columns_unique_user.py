@@ -0,0 +1,114 @@
+"""kyc upload cache columns, unique kyc_records.user_id, composite indexes
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-14
+
+Brings databases created before these model changes up to date:
+  • kyc_records: face_embedding / analysis_json / thumbnail_b64 columns
+  • kyc_records.user_id: de-duplicated (newest upload kept) and made unique
+  • consent_records / audit_logs: composite indexes replace single-column ones
+
+Every step inspects the live schema first, so the revision is a no-op on a
+fresh database that create_all() already built from the current models.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+_KYC_COLUMNS = (
+    ("face_embedding", sa.LargeBinary()),
+    ("analysis_json", sa.Text()),
+    ("thumbnail_b64", sa.Text()),
+)
+
+_CONSENT_INDEXES = {
+    "ix_consent_user_bank_status": ["user_id", "bank_id", "status"],
+    "ix_consent_bank_status": ["bank_id", "status"],
+}
+_AUDIT_INDEXES = {
+    "ix_audit_actor_created": ["actor_id", "created_at"],
+    "ix_audit_target_created": ["target_user_id", "created_at"],
+    "ix_audit_event_created": ["event_type", "created_at"],
+}
+
+
+def _indexes(inspector, table: str) -> dict:
+    return {ix["name"]: ix for ix in inspector.get_indexes(table)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    # ── kyc_records ──
+    if "kyc_records" in tables:
+        existing = {c["name"] for c in inspector.get_columns("kyc_records")}
+        for name, type_ in _KYC_COLUMNS:
+            if name not in existing:
+                op.add_column("kyc_records", sa.Column(name, type_, nullable=True))
+
+        indexes = _indexes(inspector, "kyc_records")
+        current = indexes.get("ix_kyc_records_user_id")
+        if not (current and current["unique"]):
+            # Keep the newest record per user; older duplicates would block
+            # the unique index.
+            op.execute(
+                """
+                DELETE FROM kyc_records WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY user_id
+                            ORDER BY uploaded_at DESC, id DESC
+                        ) AS rn
+                        FROM kyc_records
+                    ) ranked WHERE rn > 1
+                )
+                """
+            )
+            if current:
+                op.drop_index("ix_kyc_records_user_id", table_name="kyc_records")
+            op.create_index(
+                "ix_kyc_records_user_id", "kyc_records", ["user_id"], unique=True
+            )
+
+    # ── consent_records ──
+    if "consent_records" in tables:
+        indexes = _indexes(inspector, "consent_records")
+        for name, cols in _CONSENT_INDEXES.items():
+            if name not in indexes:
+                op.create_index(name, "consent_records", cols)
+        # Leading columns of the composites cover these lookups.
+        for name in ("ix_consent_records_user_id", "ix_consent_records_bank_id"):
+            if name in indexes:
+                op.drop_index(name, table_name="consent_records")
+
+    # ── audit_logs ──
+    if "audit_logs" in tables:
+        indexes = _indexes(inspector, "audit_logs")
+        for name, cols in _AUDIT_INDEXES.items():
+            if name not in indexes:
+                op.create_index(name, "audit_logs", cols)
+
+
+def downgrade() -> None:
+    for name in _AUDIT_INDEXES:
+        op.drop_index(name, table_name="audit_logs")
+
+    op.create_index("ix_consent_records_user_id", "consent_records", ["user_id"])
+    op.create_index("ix_consent_records_bank_id", "consent_records", ["bank_id"])
+    for name in _CONSENT_INDEXES:
+        op.drop_index(name, table_name="consent_records")
+
+    # De-duplicated rows are not restored; only the constraint is relaxed.
+    op.drop_index("ix_kyc_records_user_id", table_name="kyc_records")
+    op.create_index("ix_kyc_records_user_id", "kyc_records", ["user_id"])
+    with op.batch_alter_table("kyc_records") as batch:
+        for name, _ in reversed(_KYC_COLUMNS):
+            batch.drop_column(name)
@@ -2,63 +2,157 @@
 app/api/audit.py
 ─────────────────
 Audit log endpoint.
-GET /audit/logs  — paginated audit log (role-filtered)
+GET /audit/logs        — keyset-paginated audit log (role-filtered)
+GET /audit/logs/count  — total matching events (short-TTL cached)
 """
 
-from typing import Optional
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+import base64
+from datetime import datetime
+from typing import List, Optional
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import TypeAdapter
+from sqlalchemy import bindparam, func, select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from app.db.database import get_db, AuditLog, User
+from app.db.database import get_async_db, AuditLog, User
 from app.middleware.rbac import require_any, require_validator, get_current_user
 from app.models.schemas import AuditLogList, AuditLogOut
 
 router = APIRouter(prefix="/audit", tags=["Audit Logs"])
 
+# (user_id, event_type) → total. Totals are only informational, so a few
+# seconds of staleness is acceptable in exchange for skipping COUNT(*) scans.
+_count_cache = TTLCache(maxsize=1_000, ttl=30)
+
+# Validates a whole page of ORM rows in one pydantic-core call
+_AUDIT_ADAPTER = TypeAdapter(List[AuditLogOut])
+
+
+def _encode_cursor(log: AuditLog) -> str:
+    """Opaque cursor: base64("<created_at ISO>|<id>") of the last row returned."""
+    raw = f"{log.created_at.isoformat()}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), log_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def _build_scopes() -> dict:
+    """
+    Pre-built RBAC base statements, one per role, keyed on a bound `uid`.
+    Built once at import so requests only append filters and bind the caller's
+    id — every caller of a role shares one statement shape, and therefore one
+    entry in SQLAlchemy's compiled-statement cache.
+
+    RBAC Rules:
+    - role=user    → Only sees events where they are actor or target.
+    - role=bank    → Only sees access events involving themselves.
+    - role=validator → Sees all logs (full audit view).
+    """
+    uid = bindparam("uid")
+
+    # Users see events where they are actor or target.
+    # PERF: An OR across two columns can't use either index, so run one
+    # sub-query per index and UNION ALL them. The second branch excludes rows
+    # already matched by the first so no event is returned twice. Outer
+    # filters are pushed down into both branches by the planner.
+    as_actor = select(AuditLog).where(AuditLog.actor_id == uid)
+    as_target = select(AuditLog).where(AuditLog.target_user_id == uid, AuditLog.actor_id != uid)
+    user_entity = aliased(AuditLog, union_all(as_actor, as_target).subquery())
+
+    return {
+        # Validators see everything
+        "validator": (select(AuditLog), AuditLog),
+        # Banks only see events where they were the actor
+        "bank": (select(AuditLog).where(AuditLog.actor_id == uid), AuditLog),
+        "user": (select(user_entity), user_entity),
+    }
+
+
+_SCOPES = _build_scopes()
+
+
+def _scoped_query(current_user: User, event_type: Optional[str], cursor: Optional[str] = None):
+    """
+    Audit SELECT for the caller's role with optional event/cursor filters.
+    Returns (statement, entity, params) — order/paginate on `entity`'s columns
+    and execute with `params`.
+    """
+    role = current_user.role.value
+    stmt, entity = _SCOPES[role]
+    conditions = []
+    if event_type:
+        conditions.append(entity.event_type == event_type)
+    if cursor:
+        conditions.append(tuple_(entity.created_at, entity.id) < _decode_cursor(cursor))
+    if conditions:
+        stmt = stmt.where(*conditions)
+    params = {} if role == "validator" else {"uid": current_user.id}
+    return stmt, entity, params
+
+
+async def _count(db: AsyncSession, current_user: User, event_type: Optional[str]) -> int:
+    """Total audit events visible to the caller, cached for 30s per user/filter."""
+    key = (current_user.id, event_type)
+    total = _count_cache.get(key)
+    if total is None:
+        stmt, _, params = _scoped_query(current_user, event_type)
+        total = await db.scalar(select(func.count()).select_from(stmt.subquery()), params)
+        _count_cache[key] = total
+    return total
+
 
 @router.get("/logs", response_model=AuditLogList)
 async def get_audit_logs(
-    skip: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
     limit: int = Query(default=50, le=200),
     event_type: Optional[str] = Query(default=None),
+    with_total: bool = Query(default=False, description="Also compute the total match count"),
     current_user: User = Depends(require_any),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
-    Return audit logs.
+    Return audit logs, newest first.
 
-    RBAC Rules:
-    - role=user    → Only sees events where they are actor or target.
-    - role=bank    → Only sees access events involving themselves.
-    - role=validator → Sees all logs (full audit view).
+    PAGINATION:
+    - Keyset on (created_at DESC, id DESC): pass the returned `next_cursor`
+      to fetch the following page. Cost is bounded by `limit`, independent
+      of how deep the caller pages (no OFFSET scan, no COUNT(*)).
+    - `next_cursor` is null on the last page.
+    - `total` is only computed when `with_total=true` (or via /audit/logs/count);
+      infinite-scroll callers skip the COUNT entirely.
 
     COMPLIANCE:
     - This endpoint satisfies RBI's audit trail requirement and GDPR's
       right to access processing records.
     - Log structure includes TX hash for blockchain verification.
     """
-    query = db.query(AuditLog)
+    stmt, entity, params = _scoped_query(current_user, event_type, cursor)
+    stmt = stmt.order_by(entity.created_at.desc(), entity.id.desc()).limit(limit + 1)
 
-    if current_user.role.value == "validator":
-        # Validators see everything
-        pass
-    elif current_user.role.value == "bank":
-        # Banks only see events where they were the actor
-        query = query.filter(AuditLog.actor_id == current_user.id)
-    else:
-        # Users see events where they are actor or target
-        query = query.filter(
-            (AuditLog.actor_id == current_user.id) |
-            (AuditLog.target_user_id == current_user.id)
-        )
-
-    if event_type:
-        query = query.filter(AuditLog.event_type == event_type)
-
-    total = query.count()
-    logs = query.order_by(AuditLog.created_at.desc()).offset(skip).limit(limit).all()
+    rows = (await db.execute(stmt, params)).scalars().all()
+    logs = rows[:limit]
+    next_cursor = _encode_cursor(logs[-1]) if len(rows) > limit else None
 
     return AuditLogList(
-        total=total,
-        logs=[AuditLogOut.model_validate(log) for log in logs],
+        total=await _count(db, current_user, event_type) if with_total else None,
+        logs=_AUDIT_ADAPTER.validate_python(logs, from_attributes=True),
+        next_cursor=next_cursor,
     )
+
+
+@router.get("/logs/count")
+async def get_audit_log_count(
+    event_type: Optional[str] = Query(default=None),
+    current_user: User = Depends(require_any),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Total audit events visible to the caller. Cached for 30s per user/filter."""
+    return {"total": await _count(db, current_user, event_type)}
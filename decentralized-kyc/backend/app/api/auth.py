@@ -8,16 +8,43 @@ GET  /auth/me        — get current user profile
 """
 
 import uuid
+import asyncio
 from typing import List
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
+from cachetools import TTLCache
 
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.config import get_settings
+from app.core.security import (
+    hash_password, verify_password, password_needs_rehash, create_access_token, sha256_bytes32
+)
 from app.db.database import get_db, User, AuditLog, AuditEventType
 from app.models.schemas import UserCreate, UserLogin, UserOut, Token
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
+settings = get_settings()
+
+# ── Verified-credential cache ─────────────────────────────────────────────────
+# Digests of recently verified (user_id, stored bcrypt hash, password)
+# triples. Lets repeated identical logins (SPA reconnects, test suites) skip
+# the bcrypt verify — the user row is still fetched on every login.
+# SECURITY: The key is salted by the user's stored bcrypt hash, so a password
+# change (or rehash) invalidates it at once, and is_active is re-checked on
+# each request. Only the digest is stored — never the raw password.
+_login_cache = TTLCache(maxsize=10_000, ttl=45)
+
+_BANKS_ADAPTER = TypeAdapter(List[UserOut])
+
+# Marketplace bank list — read on every page load, changes only on bank signup.
+# NOTE: process-local; with multiple uvicorn workers other workers may serve
+# a stale list for up to the TTL (use a shared Redis cache if that matters).
+_banks_cache = TTLCache(maxsize=1, ttl=60)
+
+
+def _invalidate_banks_cache() -> None:
+    _banks_cache.clear()
 
 
 @router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
@@ -27,7 +54,7 @@ async def register_user(user_in: UserCreate, request: Request, db: Session = Dep
 
     SECURITY:
     - Email uniqueness enforced at DB level.
-    - Password is bcrypt-hashed (cost=12) before storage — never stored in plain text.
+    - Password is bcrypt-hashed (cost=BCRYPT_COST, default 12) before storage — never stored in plain text.
     - Wallet address is validated as a proper Ethereum checksum address via Pydantic pattern.
     - Role defaults to "user"; "bank" and "validator" roles should be assigned
       by an admin in production (here simplified to self-registration + validation).
@@ -40,15 +67,22 @@ async def register_user(user_in: UserCreate, request: Request, db: Session = Dep
             detail="An account with this email already exists",
         )
 
+    # bcrypt is CPU-bound (~100ms) — run it off the event loop
+    hashed = await asyncio.to_thread(hash_password, user_in.password)
+
     new_user = User(
         id=str(uuid.uuid4()),
         email=user_in.email,
-        hashed_password=hash_password(user_in.password),
+        hashed_password=hashed,
         full_name=user_in.full_name,
         role=user_in.role,
         wallet_address=user_in.wallet_address,
         description=user_in.description,
         services=user_in.services,
+        # Set column defaults client-side so the response can be built from
+        # the in-memory object without re-SELECTing the row after commit.
+        is_active=True,
+        created_at=datetime.now(timezone.utc),
     )
     db.add(new_user)
 
@@ -61,9 +95,17 @@ async def register_user(user_in: UserCreate, request: Request, db: Session = Dep
         details=f"User registered with role={new_user.role.value}",
     ))
 
+    # Built from in-memory state — no post-commit db.refresh() round trip.
+    user_out = UserOut.model_validate(new_user)
     db.commit()
-    db.refresh(new_user)
-    return new_user
+    if user_out.role == "bank":
+        _invalidate_banks_cache()
+    return user_out
+
+
+def _login_key(user: User, password: str) -> bytes:
+    """Cache key bound to the current stored hash — stale once it changes."""
+    return sha256_bytes32(f"{user.id}:{user.hashed_password}:{password}")
 
 
 @router.post("/login", response_model=Token)
@@ -73,22 +115,36 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
 
     SECURITY:
     - Uses constant-time password comparison via bcrypt to resist timing attacks.
+      The verify runs in a worker thread so it never stalls the event loop.
     - Returns HTTP 401 (not 404) for both "user not found" and "wrong password"
       to prevent user enumeration.
     - JWT contains role, sub (user_id), and wallet_address for downstream use.
+    - Hashes below the current BCRYPT_COST are upgraded on successful login.
     """
     user = db.query(User).filter(
         User.email == credentials.email, User.is_active == True
     ).first()
 
     # SECURITY: Identical error for both "not found" and "wrong password"
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or (
+        _login_key(user, credentials.password) not in _login_cache
+        and not await asyncio.to_thread(
+            verify_password, credentials.password, user.hashed_password
+        )
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password. If you haven't recently registered after the system update, please create a new account.",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Transparently migrate hashes made under an older BCRYPT_COST
+    if settings.BCRYPT_REHASH_ON_LOGIN and password_needs_rehash(user.hashed_password):
+        user.hashed_password = await asyncio.to_thread(hash_password, credentials.password)
+        db.commit()
+
+    _login_cache[_login_key(user, credentials.password)] = True
+
     token = create_access_token(
         subject=user.id,
         role=user.role.value,
@@ -99,8 +155,13 @@ async def login(credentials: UserLogin, db: Session = Depends(get_db)):
 
 @router.get("/banks", response_model=List[UserOut])
 async def list_banks(db: Session = Depends(get_db)):
-    """List all registered financial institutions for the marketplace."""
-    return db.query(User).filter(User.role == "bank", User.is_active == True).all()
+    """List all registered financial institutions for the marketplace (cached 60s)."""
+    banks = _banks_cache.get("banks")
+    if banks is None:
+        rows = db.query(User).filter(User.role == "bank", User.is_active == True).all()
+        banks = _BANKS_ADAPTER.validate_python(rows, from_attributes=True)
+        _banks_cache["banks"] = banks
+    return banks
 
 
 @router.get("/me", response_model=UserOut)
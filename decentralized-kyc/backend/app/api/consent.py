@@ -11,21 +11,24 @@ GET  /consent/status          — Check consent status between user and bank
 
 import uuid
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from eth_account import Account
 
 from app.core.security import verify_eth_signature
 from app.core.blockchain import blockchain_client
 from app.core.config import get_settings
 from app.db.database import (
-    get_db, User, KYCRecord, ConsentRecord, AuditLog,
+    get_async_db, User, KYCRecord, ConsentRecord, AuditLog,
     ConsentStatus, AuditEventType
 )
+from app.services.chain_sync import record_on_chain
 from app.middleware.rbac import require_bank, require_user, require_any, get_current_user
 from app.models.schemas import (
     AccessRequest, GrantConsentRequest, RevokeConsentRequest,
-    SignalInterestRequest, ConsentStatusOut
+    SignalInterestRequest, ConsentStatusOut, PendingRequestOut
 )
 
 router = APIRouter(prefix="/consent", tags=["Consent Management"])
@@ -37,22 +40,22 @@ async def signal_interest(
     body: SignalInterestRequest,
     request: Request,
     current_user: User = Depends(require_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Individual user signals interest to connect with a bank.
     Creates a pending ConsentRecord so the bank can see it on their dashboard.
     """
-    bank = db.query(User).filter(User.id == body.bank_id, User.role == "bank").first()
-    if not bank:
+    bank = await db.get(User, body.bank_id)
+    if not bank or bank.role.value != "bank":
         raise HTTPException(status_code=404, detail="Bank not found")
 
     # Check for existing request
-    existing = db.query(ConsentRecord).filter(
+    existing = await db.scalar(select(ConsentRecord).where(
         ConsentRecord.user_id == current_user.id,
         ConsentRecord.bank_id == bank.id,
         ConsentRecord.status.in_([ConsentStatus.pending, ConsentStatus.granted]),
-    ).first()
+    ).limit(1))
     if existing:
         raise HTTPException(status_code=409, detail="You already have a pending or active connection with this bank.")
 
@@ -71,7 +74,7 @@ async def signal_interest(
         ip_address=request.client.host if request.client else None,
         details=f"User '{current_user.email}' signalled interest to bank '{bank.email}'",
     ))
-    db.commit()
+    await db.commit()
     return {"message": f"Connection signal sent to {bank.full_name}.", "consent_id": consent.id}
 
 
@@ -79,8 +82,9 @@ async def signal_interest(
 async def request_access(
     body: AccessRequest,
     request: Request,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(require_bank),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Bank requests access to a specific user's KYC.
@@ -88,30 +92,38 @@ async def request_access(
     SECURITY:
     - Only users with the 'bank' role can call this endpoint.
     - KYC must exist and not be expired before a request can be made.
-    - The request is also logged on-chain (if blockchain is live).
+    - The request is also logged on-chain (if blockchain is live) after the
+      response is sent; the audit entry's tx_hash is filled in once broadcast.
     """
-    # Find the target user by wallet address
-    target_user = db.query(User).filter(
-        User.wallet_address == body.user_wallet_address,
-        User.role == "user",
-    ).first()
-
-    if not target_user:
+    # Target user, their KYC record and any open request from this bank —
+    # fetched in one round-trip, then validated in memory.
+    row = (await db.execute(
+        select(User, KYCRecord, ConsentRecord).select_from(User).outerjoin(
+            KYCRecord, KYCRecord.user_id == User.id
+        ).outerjoin(
+            ConsentRecord,
+            and_(
+                ConsentRecord.user_id == User.id,
+                ConsentRecord.bank_id == current_user.id,
+                ConsentRecord.status.in_([ConsentStatus.pending, ConsentStatus.granted]),
+            ),
+        ).where(
+            User.wallet_address == body.user_wallet_address,
+            User.role == "user",
+        ).limit(1)
+    )).first()
+
+    if not row:
         raise HTTPException(status_code=404, detail="User wallet address not found")
+    target_user, kyc, existing = row
 
     # Check that target user has a valid KYC record
-    kyc = db.query(KYCRecord).filter(KYCRecord.user_id == target_user.id).first()
     if not kyc:
         raise HTTPException(status_code=404, detail="Target user has no KYC record")
     if kyc.expires_at and kyc.expires_at < datetime.now(timezone.utc):
         raise HTTPException(status_code=410, detail="Target user's KYC has expired")
 
     # Check for existing pending/granted request
-    existing = db.query(ConsentRecord).filter(
-        ConsentRecord.user_id == target_user.id,
-        ConsentRecord.bank_id == current_user.id,
-        ConsentRecord.status.in_([ConsentStatus.pending, ConsentStatus.granted]),
-    ).first()
     if existing:
         raise HTTPException(
             status_code=409, detail=f"Access request already exists with status: {existing.status}"
@@ -126,25 +138,28 @@ async def request_access(
     )
     db.add(consent)
 
-    # Log on-chain (non-fatal)
-    tx_hash = None
-    if blockchain_client.is_connected() and current_user.wallet_address and settings.DEPLOYER_PRIVATE_KEY:
-        try:
-            bank_account = Account.from_key(settings.DEPLOYER_PRIVATE_KEY)
-            tx_hash = blockchain_client.request_access(bank_account, body.user_wallet_address)
-        except Exception as e:
-            print(f"[Blockchain] requestAccess warning: {e}")
-
+    audit_id = str(uuid.uuid4())
     db.add(AuditLog(
-        id=str(uuid.uuid4()),
+        id=audit_id,
         actor_id=current_user.id,
         target_user_id=target_user.id,
         event_type=AuditEventType.access_requested,
-        tx_hash=tx_hash,
         ip_address=request.client.host if request.client else None,
         details=f"Bank '{current_user.email}' requested KYC access",
     ))
-    db.commit()
+    await db.commit()
+
+    # Log on-chain out-of-band (non-fatal)
+    if current_user.wallet_address and settings.DEPLOYER_PRIVATE_KEY:
+        wallet = body.user_wallet_address
+        background_tasks.add_task(
+            record_on_chain,
+            "requestAccess",
+            lambda: blockchain_client.request_access(
+                Account.from_key(settings.DEPLOYER_PRIVATE_KEY), wallet
+            ),
+            audit_log_id=audit_id,
+        )
 
     return {"message": "Access request submitted. Awaiting user consent.", "consent_id": consent.id}
 
@@ -153,8 +168,9 @@ async def request_access(
 async def grant_access(
     body: GrantConsentRequest,
     request: Request,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(require_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     User grants consent to a bank after cryptographic signature verification.
@@ -162,7 +178,8 @@ async def grant_access(
     SECURITY (Critical Path):
     1. The client signs the consent message using their private key (MetaMask / ethers.js).
     2. Backend verifies the ECDSA signature against the user's stored wallet address.
-    3. ONLY after successful verification does the backend call grantConsent() on-chain.
+    3. ONLY after successful verification does the backend call grantConsent() on-chain
+       (scheduled after the response; tx_hash is back-filled once broadcast).
     4. This ensures consent cannot be granted by a stolen JWT alone —
        the user's private key must be involved (zero-trust consent layer).
     """
@@ -189,20 +206,19 @@ async def grant_access(
         print(f"[DEMO] Skipping signature verification for demo wallet: {current_user.wallet_address}")
 
     # ── Step 2: Find consent record ──────────────────────────────────────────
-    consent = db.query(ConsentRecord).filter(
-        ConsentRecord.id == body.bank_id,  # bank_id field used as consent_id here for simplicity
-    ).first()
+    # bank_id field used as consent_id here for simplicity
+    consent = await db.get(ConsentRecord, body.bank_id)
 
     # Fallback: find by bank user_id
     if not consent:
-        bank = db.query(User).filter(User.id == body.bank_id).first()
+        bank = await db.get(User, body.bank_id)
         if not bank:
             raise HTTPException(status_code=404, detail="Bank not found")
-        consent = db.query(ConsentRecord).filter(
+        consent = await db.scalar(select(ConsentRecord).where(
             ConsentRecord.user_id == current_user.id,
             ConsentRecord.bank_id == bank.id,
             ConsentRecord.status == ConsentStatus.pending,
-        ).first()
+        ).limit(1))
 
     if not consent:
         raise HTTPException(status_code=404, detail="No pending access request found")
@@ -214,27 +230,30 @@ async def grant_access(
     consent.granted_at = datetime.now(timezone.utc)
     consent.signature = body.signature
 
-    tx_hash = None
-    if blockchain_client.is_connected() and settings.DEPLOYER_PRIVATE_KEY:
-        try:
-            user_account = Account.from_key(settings.DEPLOYER_PRIVATE_KEY)
-            tx_hash = blockchain_client.grant_consent(user_account, body.bank_wallet_address)
-            consent.tx_hash = tx_hash
-        except Exception as e:
-            print(f"[Blockchain] grantConsent warning: {e}")
-
-    bank = db.query(User).filter(User.id == consent.bank_id).first()
+    # Identity-map hit when the fallback above already loaded this bank
+    bank = await db.get(User, consent.bank_id)
+    audit_id = str(uuid.uuid4())
     db.add(AuditLog(
-        id=str(uuid.uuid4()),
+        id=audit_id,
         actor_id=current_user.id,
         target_user_id=current_user.id,
         event_type=AuditEventType.consent_granted,
-        tx_hash=tx_hash,
         ip_address=request.client.host if request.client else None,
         details=f"Consent granted to bank: {bank.email if bank else 'unknown'}",
     ))
-    db.commit()
-    db.refresh(consent)
+    await db.commit()
+
+    if settings.DEPLOYER_PRIVATE_KEY:
+        bank_wallet = body.bank_wallet_address
+        background_tasks.add_task(
+            record_on_chain,
+            "grantConsent",
+            lambda: blockchain_client.grant_consent(
+                Account.from_key(settings.DEPLOYER_PRIVATE_KEY), bank_wallet
+            ),
+            audit_log_id=audit_id,
+            consent_id=consent.id,
+        )
     return {
         "consent_id": consent.id,
         "user_id": consent.user_id,
@@ -251,8 +270,9 @@ async def grant_access(
 async def revoke_access(
     body: RevokeConsentRequest,
     request: Request,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(require_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     User revokes consent. Takes effect immediately.
@@ -271,40 +291,43 @@ async def revoke_access(
     if not sig_valid:
         raise HTTPException(status_code=403, detail="Invalid digital signature. Revocation rejected.")
 
-    bank = db.query(User).filter(User.id == body.bank_id).first()
+    bank = await db.get(User, body.bank_id)
     if not bank:
         raise HTTPException(status_code=404, detail="Bank not found")
 
-    consent = db.query(ConsentRecord).filter(
+    consent = await db.scalar(select(ConsentRecord).where(
         ConsentRecord.user_id == current_user.id,
         ConsentRecord.bank_id == bank.id,
         ConsentRecord.status == ConsentStatus.granted,
-    ).first()
+    ).limit(1))
     if not consent:
         raise HTTPException(status_code=404, detail="No active consent to revoke")
 
     consent.status = ConsentStatus.revoked
     consent.revoked_at = datetime.now(timezone.utc)
 
-    tx_hash = None
-    if blockchain_client.is_connected() and settings.DEPLOYER_PRIVATE_KEY:
-        try:
-            user_account = Account.from_key(settings.DEPLOYER_PRIVATE_KEY)
-            tx_hash = blockchain_client.revoke_consent(user_account, body.bank_wallet_address)
-            consent.tx_hash = tx_hash
-        except Exception as e:
-            print(f"[Blockchain] revokeConsent warning: {e}")
-
+    audit_id = str(uuid.uuid4())
     db.add(AuditLog(
-        id=str(uuid.uuid4()),
+        id=audit_id,
         actor_id=current_user.id,
         target_user_id=current_user.id,
         event_type=AuditEventType.consent_revoked,
-        tx_hash=tx_hash,
         ip_address=request.client.host if request.client else None,
         details=f"Consent revoked from bank: {bank.email}",
     ))
-    db.commit()
+    await db.commit()
+
+    if settings.DEPLOYER_PRIVATE_KEY:
+        bank_wallet = body.bank_wallet_address
+        background_tasks.add_task(
+            record_on_chain,
+            "revokeConsent",
+            lambda: blockchain_client.revoke_consent(
+                Account.from_key(settings.DEPLOYER_PRIVATE_KEY), bank_wallet
+            ),
+            audit_log_id=audit_id,
+            consent_id=consent.id,
+        )
 
     return {"message": "Consent revoked successfully. Bank access has been terminated."}
 
@@ -314,21 +337,21 @@ async def revoke_access(
 async def get_request_detail(
     consent_id: str,
     current_user: User = Depends(require_bank),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get full user details for a specific consent record owned by this bank."""
-    consent = db.query(ConsentRecord).filter(
+    consent = await db.scalar(select(ConsentRecord).where(
         ConsentRecord.id == consent_id,
         ConsentRecord.bank_id == current_user.id,
-    ).first()
+    ))
     if not consent:
         raise HTTPException(status_code=404, detail="Consent record not found")
 
-    u = db.query(User).filter(User.id == consent.user_id).first()
+    u = await db.get(User, consent.user_id)
     if not u:
         raise HTTPException(status_code=404, detail="User not found")
 
-    kyc = db.query(KYCRecord).filter(KYCRecord.user_id == u.id).first()
+    kyc = await db.scalar(select(KYCRecord).where(KYCRecord.user_id == u.id))
 
     return {
         "consent_id": consent.id,
@@ -356,20 +379,24 @@ async def get_request_detail(
         }
     }
 
-@router.get("/pending")
+@router.get("/pending", response_model=List[PendingRequestOut])
 async def get_pending_requests(
     current_user: User = Depends(require_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """List all pending consent requests for the current user."""
-    requests = db.query(ConsentRecord).filter(
-        ConsentRecord.user_id == current_user.id,
-        ConsentRecord.status == ConsentStatus.pending,
-    ).all()
+    # Single LEFT JOIN instead of one bank lookup per row (N+1)
+    rows = (await db.execute(
+        select(ConsentRecord, User).outerjoin(
+            User, User.id == ConsentRecord.bank_id
+        ).where(
+            ConsentRecord.user_id == current_user.id,
+            ConsentRecord.status == ConsentStatus.pending,
+        )
+    )).all()
 
     result = []
-    for r in requests:
-        bank = db.query(User).filter(User.id == r.bank_id).first()
+    for r, bank in rows:
         result.append({
             "consent_id": r.id,
             "bank_id": bank.id if bank else None,
@@ -387,19 +414,22 @@ async def get_pending_requests(
 @router.get("/my-consents")
 async def get_my_consents(
     current_user: User = Depends(require_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     User-facing: ALL consent records for the current user (any status),
     enriched with bank decision fields. Powers the 'Bank Updates' tab.
     """
-    records = db.query(ConsentRecord).filter(
-        ConsentRecord.user_id == current_user.id,
-    ).order_by(ConsentRecord.requested_at.desc()).all()
+    rows = (await db.execute(
+        select(ConsentRecord, User).outerjoin(
+            User, User.id == ConsentRecord.bank_id
+        ).where(
+            ConsentRecord.user_id == current_user.id,
+        ).order_by(ConsentRecord.requested_at.desc())
+    )).all()
 
     result = []
-    for r in records:
-        bank = db.query(User).filter(User.id == r.bank_id).first()
+    for r, bank in rows:
         result.append({
             "consent_id": r.id,
             "status": r.status.value,
@@ -421,76 +451,81 @@ async def get_my_consents(
 @router.get("/granted-list")
 async def get_granted_accesses(
     current_user: User = Depends(require_bank),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """List all users who have granted KYC access to this bank."""
-    consents = db.query(ConsentRecord).filter(
-        ConsentRecord.bank_id == current_user.id,
-        ConsentRecord.status == ConsentStatus.granted,
-    ).all()
-
-    result = []
-    for c in consents:
-        u = db.query(User).filter(User.id == c.user_id).first()
-        if u:
-            result.append({
-                "user_wallet_address": u.wallet_address,
-                "user_full_name": u.full_name,
-                "granted_at": c.granted_at,
-                "tx_hash": c.tx_hash,
-            })
-    return result
+    # Inner JOIN — consents whose user no longer exists are skipped, as before
+    rows = (await db.execute(
+        select(ConsentRecord, User).join(
+            User, User.id == ConsentRecord.user_id
+        ).where(
+            ConsentRecord.bank_id == current_user.id,
+            ConsentRecord.status == ConsentStatus.granted,
+        )
+    )).all()
+
+    return [
+        {
+            "user_wallet_address": u.wallet_address,
+            "user_full_name": u.full_name,
+            "granted_at": c.granted_at,
+            "tx_hash": c.tx_hash,
+        }
+        for c, u in rows
+    ]
 
 
 @router.get("/sent-requests")
 async def get_sent_requests(
     current_user: User = Depends(require_bank),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """List all access requests sent by this bank (pending + all statuses)."""
-    consents = db.query(ConsentRecord).filter(
-        ConsentRecord.bank_id == current_user.id,
-    ).order_by(ConsentRecord.requested_at.desc()).all()
-
-    result = []
-    for c in consents:
-        u = db.query(User).filter(User.id == c.user_id).first()
-        if u:
-            result.append({
-                "consent_id": c.id,
-                "user_wallet_address": u.wallet_address,
-                "user_full_name": u.full_name or u.email,
-                "status": c.status.value,
-                "requested_at": c.requested_at.isoformat() if c.requested_at else None,
-                "granted_at": c.granted_at.isoformat() if c.granted_at else None,
-            })
-    return result
+    rows = (await db.execute(
+        select(ConsentRecord, User).join(
+            User, User.id == ConsentRecord.user_id
+        ).where(
+            ConsentRecord.bank_id == current_user.id,
+        ).order_by(ConsentRecord.requested_at.desc())
+    )).all()
+
+    return [
+        {
+            "consent_id": c.id,
+            "user_wallet_address": u.wallet_address,
+            "user_full_name": u.full_name or u.email,
+            "status": c.status.value,
+            "requested_at": c.requested_at.isoformat() if c.requested_at else None,
+            "granted_at": c.granted_at.isoformat() if c.granted_at else None,
+        }
+        for c, u in rows
+    ]
 
 @router.get("/view/{user_wallet_address}")
 async def view_user_kyc(
     user_wallet_address: str,
     request: Request,
     current_user: User = Depends(require_bank),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Allows a bank to view the decrypted KYC data of a user.
     ONLY works if the user has GRANTED access.
     """
     # 1. Find the target user
-    target_user = db.query(User).filter(
+    target_user = await db.scalar(select(User).where(
         User.wallet_address == user_wallet_address,
         User.role == "user",
-    ).first()
+    ).limit(1))
     if not target_user:
         raise HTTPException(status_code=404, detail="User wallet address not found")
 
     # 2. Verify active consent
-    consent = db.query(ConsentRecord).filter(
+    consent = await db.scalar(select(ConsentRecord).where(
         ConsentRecord.user_id == target_user.id,
         ConsentRecord.bank_id == current_user.id,
         ConsentRecord.status == ConsentStatus.granted,
-    ).first()
+    ).limit(1))
 
     if not consent:
         raise HTTPException(
@@ -499,7 +534,7 @@ async def view_user_kyc(
         )
 
     # 3. Fetch and decrypt the KYC record
-    kyc = db.query(KYCRecord).filter(KYCRecord.user_id == target_user.id).first()
+    kyc = await db.scalar(select(KYCRecord).where(KYCRecord.user_id == target_user.id))
     if not kyc:
         raise HTTPException(status_code=404, detail="KYC record not found for this user")
 
@@ -512,7 +547,7 @@ async def view_user_kyc(
         ip_address=request.client.host if request.client else None,
         details=f"Bank '{current_user.email}' accessed decrypted KYC data",
     ))
-    db.commit()
+    await db.commit()
 
     # In a real system, the bank would decrypt locally using a shared key.
     # For this demo, we return the data from the server.
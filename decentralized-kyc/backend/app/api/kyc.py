@@ -7,143 +7,264 @@ GET  /kyc/status   — get current user's KYC status
 GET  /kyc/document — retrieve & decrypt document (requires active consent or own access)
 """
 
+import json
+import logging
 import uuid
+import asyncio
 from datetime import datetime, timezone, timedelta
-from typing import Optional
-
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status, Request
-from sqlalchemy.orm import Session
-
-from app.core.security import sha256_bytes32, sha256_hex
+from typing import Optional, Tuple
+
+from cachetools import TTLCache
+from fastapi import (
+    APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form, status, Request
+)
+from fastapi.responses import Response
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import sha256_bytes32
 from app.core.blockchain import blockchain_client
 from app.core.ipfs import ipfs_client
 from app.core.config import get_settings
-from app.db.database import get_db, User, KYCRecord, AuditLog, AuditEventType
+from app.db.database import get_async_db, User, KYCRecord, AuditLog, AuditEventType
 from app.middleware.rbac import require_user, require_any, get_current_user
 from app.models.schemas import KYCUploadResponse, KYCStatus, LivenessRequest, LivenessResponse
-from app.services.fraud_detection import scan_document
-from app.services.liveness import verify_liveness, compare_faces
+from app.services.fraud_detection import prescreen_document, score_digest, KNOWN_FRAUD_HASHES
+from app.services.liveness import (
+    decode_image_b64_async, verify_liveness_async, compare_faces_async,
+    extract_embedding, compare_embedding_async, has_face_embedding,
+)
+from app.services.chain_sync import record_on_chain
+from app.services.document_analysis import analyze_document
 
 router = APIRouter(prefix="/kyc", tags=["KYC"])
 settings = get_settings()
+# Upload tracing — lazily formatted, free when DEBUG is off
+logger = logging.getLogger(__name__)
+
+_UPLOAD_CHUNK_SIZE = 64 * 1024
+# Settings are fixed for the process lifetime — resolve per-request values once
+_MAX_BYTES = settings.MAX_DOCUMENT_SIZE_MB * 1024 * 1024
+_MAX_SIZE_DETAIL = f"File exceeds maximum size of {settings.MAX_DOCUMENT_SIZE_MB} MB"
+
+# Fraud scores at or above this are rejected at upload
+_FRAUD_REJECT_SCORE = 80
+_FRAUD_DETAIL = "Document flagged by fraud detection. Please upload a valid document."
+
+# Strong references to fire-and-forget tasks so they aren't GC'd mid-flight
+_pending_tasks: set = set()
+
+
+# user_id → KYCStatus for /status polling. Short TTL bounds staleness across
+# workers; writers in this module invalidate their own process immediately.
+_status_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+
+
+def _split_analysis(result: dict) -> Tuple[str, Optional[str]]:
+    """Split an analyze_document() result into (analysis_json, thumbnail_b64) columns."""
+    thumbnail_b64 = result["analysis"].pop("thumbnail_b64", None)
+    return json.dumps(result), thumbnail_b64
+
+
+def _spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
 
 
 @router.post("/upload", response_model=KYCUploadResponse)
 async def upload_kyc(
     request: Request,
+    background_tasks: BackgroundTasks,
     doc_type: str = Form(default="passport"),
     validity_days: int = Form(default=365),
     file: UploadFile = File(...),
     current_user: User = Depends(require_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Upload a KYC document.
 
     Processing pipeline:
-    1. Validate file type and size.
-    2. Run AI fraud detection scan (placeholder).
-    3. AES-256-GCM encrypt the raw document bytes.
-    4. Upload encrypted blob to IPFS — get CID.
+    1. Validate file size; run the cheap fraud checks (type, size, magic
+       bytes) and reject flagged documents before any upload work.
+    2. Run the /identify image analysis and face embedding concurrently
+       with 3–4.
+    3. AES-256-GCM encrypt the raw document bytes, hashing them (SHA-256)
+       in the same chunked pass when a known-fraud list is loaded.
+    4. Upload encrypted blob to IPFS — get CID; check the digest against
+       known fraudulent documents; pin in the background.
     5. SHA-256 hash the CID for on-chain storage.
-    6. Call registerKYCHash() on smart contract.
-    7. Store metadata in DB (never the raw document).
+    6. Store metadata, face embedding and cached analysis in DB (never the
+       raw document).
+    7. Call registerKYCHash() on smart contract — scheduled after the
+       response; tx_hash is back-filled on the KYC and audit rows.
 
     SECURITY:
-    - Max file size enforced before reading into memory.
+    - Max file size enforced while reading — at most one chunk past the cap
+      is ever buffered.
     - Only the encrypted ciphertext touches the server's RAM transiently.
     - The raw plaintext bytes are never written to disk.
     - blockchain_client.register_kyc_hash() uses the DEPLOYER account (meta-tx).
     """
     # ── 1. Validate file size ─────────────────────────────────────────────────
-    print(f"[Debug] Upload started for user {current_user.id}")
-    max_bytes = settings.MAX_DOCUMENT_SIZE_MB * 1024 * 1024
-    file_bytes = await file.read()
-    print(f"[Debug] File size: {len(file_bytes)} bytes")
-    if len(file_bytes) > max_bytes:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File exceeds maximum size of {settings.MAX_DOCUMENT_SIZE_MB} MB",
-        )
-
-    # ── 2. Fraud detection (AI placeholder) ───────────────────────────────────
-    print("[Debug] Running fraud detection...")
-    fraud_score = await scan_document(file_bytes, file.content_type or "")
-    print(f"[Debug] Fraud score: {fraud_score}")
-    if fraud_score >= 80:
+    logger.debug("Upload started for user %s", current_user.id)
+    # Read in 64 KiB chunks and bail out as soon as the cap is crossed, so an
+    # oversized upload never gets fully buffered before the 413.
+    buf = bytearray()
+    while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+        buf += chunk
+        if len(buf) > _MAX_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=_MAX_SIZE_DETAIL,
+            )
+    file_bytes = buf    # bytes-like; used as-is to avoid a full-size copy
+    logger.debug("File size: %d bytes", len(file_bytes))
+
+    # Header-only fraud checks first, so a flagged document never costs an
+    # encrypt + upload pass
+    content_type = file.content_type or ""
+    prescreen_score = prescreen_document(file_bytes, content_type)
+    if prescreen_score is not None and prescreen_score >= _FRAUD_REJECT_SCORE:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="Document flagged by fraud detection. Please upload a valid document.",
+            detail=_FRAUD_DETAIL,
         )
 
-    # ── 3–4. Encrypt and upload to IPFS ──────────────────────────────────────
+    # ── 2–4. Encrypt + IPFS upload, then digest check ───────────────────────
+    # One pass over the plaintext: the upload stream hashes each chunk as it
+    # encrypts it, and the known-fraud check reuses that digest. A document
+    # flagged by it is never pinned; its ciphertext is left for IPFS GC.
+    logger.debug("Running IPFS upload + document analysis concurrently")
+    # /identify analysis runs on the in-memory plaintext alongside the upload
+    analysis_task = asyncio.create_task(asyncio.to_thread(analyze_document, file_bytes))
+    # Face embedding of the ID photo, extracted while the plaintext is still
+    # in memory so /liveness never has to download + decrypt the document.
+    embedding_task = asyncio.create_task(asyncio.to_thread(extract_embedding, file_bytes))
     try:
-        print("[Debug] Encrypting and uploading to IPFS...")
-        ipfs_cid = await ipfs_client.upload_encrypted(file_bytes)
-        print(f"[Debug] IPFS CID: {ipfs_cid}")
-        await ipfs_client.pin(ipfs_cid)     # Pin to prevent GC
+        ipfs_cid, doc_sha256 = await ipfs_client.upload_encrypted_with_digest(
+            file_bytes, with_digest=prescreen_score is None and bool(KNOWN_FRAUD_HASHES)
+        )
+        logger.debug("IPFS CID: %s", ipfs_cid)
     except Exception as e:
+        analysis_task.cancel()
+        embedding_task.cancel()
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail=f"IPFS upload failed: {str(e)}",
         )
 
+    fraud_score = prescreen_score if prescreen_score is not None else score_digest(doc_sha256)
+    logger.debug("Fraud score: %s", fraud_score)
+    if fraud_score >= _FRAUD_REJECT_SCORE:
+        analysis_task.cancel()
+        embedding_task.cancel()
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=_FRAUD_DETAIL,
+        )
+
+    # Pin to prevent GC — fire-and-forget, failure is non-fatal
+    _spawn(ipfs_client.pin(ipfs_cid))
+
+    embedding = await embedding_task
+    # NULL unless an ArcFace model produced a real descriptor
+    face_embedding = embedding.tobytes() if embedding is not None else None
+
+    try:
+        analysis_json, thumbnail_b64 = _split_analysis(await analysis_task)
+    except Exception as e:
+        # Non-fatal: /identify falls back to analysing on demand
+        print(f"[KYC] Document analysis failed: {e}")
+        analysis_json, thumbnail_b64 = None, None
+
     # ── 5. Hash the CID ──────────────────────────────────────────────────────
-    kyc_hash_hex = sha256_hex(ipfs_cid)
+    # One digest, two views: the raw 32 bytes go on-chain, the hex into the DB
     kyc_hash_bytes32 = sha256_bytes32(ipfs_cid)
+    kyc_hash_hex = kyc_hash_bytes32.hex()
 
-    # ── 6. Register on blockchain ─────────────────────────────────────────────
-    tx_hash: Optional[str] = None
-    if blockchain_client.is_connected() and current_user.wallet_address:
-        try:
-            tx_hash = blockchain_client.register_kyc_hash(
-                user_address=current_user.wallet_address,
-                kyc_hash_bytes32=kyc_hash_bytes32,
-                ipfs_cid=ipfs_cid,
-                validity_days=validity_days,
-            )
-        except Exception as e:
-            # Non-fatal in development; log and continue
-            print(f"[Blockchain] Registration warning: {e}")
-
-    # ── 7. Persist metadata in DB ─────────────────────────────────────────────
-    print("[Debug] Storing in DB...")
+    # ── 6. Persist metadata in DB ─────────────────────────────────────────────
+    logger.debug("Storing in DB")
     expires_at = (
         datetime.now(timezone.utc) + timedelta(days=validity_days)
         if validity_days > 0
         else None
     )
 
-    # Remove any existing KYC record (re-upload replaces)
-    print(f"[Debug] Deleting old records for user {current_user.id}")
-    db.query(KYCRecord).filter(KYCRecord.user_id == current_user.id).delete()
-
-    kyc_record = KYCRecord(
+    # Re-upload replaces any existing KYC record, resetting verification state
+    kyc_values = dict(
         id=str(uuid.uuid4()),
         user_id=current_user.id,
         ipfs_cid=ipfs_cid,
         kyc_hash=kyc_hash_hex,
-        tx_hash=tx_hash,
+        tx_hash=None,
         doc_type=doc_type,
+        is_verified=False,
+        uploaded_at=datetime.now(timezone.utc),
         expires_at=expires_at,
         fraud_score=fraud_score,
+        liveness_score=None,
+        liveness_verified=False,
+        face_embedding=face_embedding,
+        analysis_json=analysis_json,
+        thumbnail_b64=thumbnail_b64,
     )
-    db.add(kyc_record)
-
-    db.add(AuditLog(
-        id=str(uuid.uuid4()),
+    if db.get_bind().dialect.name == "postgresql":
+        # Single INSERT ... ON CONFLICT (user_id) DO UPDATE — no window where
+        # a concurrent reader sees the user without a KYC row.
+        stmt = pg_insert(KYCRecord).values(**kyc_values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[KYCRecord.user_id],
+            set_={k: stmt.excluded[k] for k in kyc_values if k not in ("id", "user_id")},
+        ).returning(KYCRecord.id)
+        kyc_id = (await db.execute(stmt)).scalar_one()
+    else:
+        # SQLite dev mode: pre-existing tables lack the unique constraint
+        # ON CONFLICT needs, so keep delete + insert.
+        logger.debug("Deleting old records for user %s", current_user.id)
+        await db.execute(delete(KYCRecord).where(KYCRecord.user_id == current_user.id))
+        await db.execute(insert(KYCRecord).values(**kyc_values))
+        kyc_id = kyc_values["id"]
+
+    # Core INSERTs throughout: nothing here is read back through the ORM, so
+    # skip identity-map tracking and unit-of-work flushes. One commit.
+    audit_id = str(uuid.uuid4())
+    await db.execute(insert(AuditLog).values(
+        id=audit_id,
         actor_id=current_user.id,
         target_user_id=current_user.id,
         event_type=AuditEventType.kyc_registered,
-        tx_hash=tx_hash,
         ip_address=request.client.host if request.client else None,
         details=f"KYC uploaded: doc_type={doc_type}, ipfs_cid={ipfs_cid}",
     ))
 
-    db.commit()
+    await db.commit()
+    _status_cache.pop(current_user.id, None)
+
+    # ── 7. Register on blockchain (out-of-band, non-fatal) ────────────────────
+    # Runs in the threadpool after the response is sent, overlapping with the
+    # pin task spawned above — neither is on the user-visible path, so there
+    # is nothing to gather here.
+    tx_hash: Optional[str] = None   # Back-filled by the background task
+    if current_user.wallet_address:
+        wallet = current_user.wallet_address
+        background_tasks.add_task(
+            record_on_chain,
+            "registerKYCHash",
+            lambda: blockchain_client.register_kyc_hash(
+                user_address=wallet,
+                kyc_hash_bytes32=kyc_hash_bytes32,
+                ipfs_cid=ipfs_cid,
+                validity_days=validity_days,
+            ),
+            audit_log_id=audit_id,
+            kyc_id=kyc_id,
+        )
 
     return KYCUploadResponse(
-        kyc_id=kyc_record.id,
+        kyc_id=kyc_id,
         ipfs_cid=ipfs_cid,
         kyc_hash=kyc_hash_hex,
         tx_hash=tx_hash,
@@ -156,43 +277,38 @@ async def upload_kyc(
 async def check_liveness(
     data: LivenessRequest,
     current_user: User = Depends(require_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     request: Request = None,
 ):
     """
     Verify liveness via live selfie AND match with uploaded ID doc.
     """
-    # Defensive: Strip data URL prefix if present
-    image_data = data.image_b64
-    if "," in image_data:
-        image_data = image_data.split(",")[1]
-    
+    # Decode the selfie once (data URL prefix stripped) for every check below.
+    # All OpenCV work runs on worker threads, off the event loop.
+    live_img = await decode_image_b64_async(data.image_b64)
+
     # 1. Basic Liveness Check (Face/Eye detection)
-    is_live_cv, liveness_score = verify_liveness(image_data)
+    is_live_cv, liveness_score = await verify_liveness_async(live_img)
     
     # 2. Identity Matching (Match with uploaded ID face)
-    record = db.query(KYCRecord).filter(KYCRecord.user_id == current_user.id).first()
+    record = await db.scalar(select(KYCRecord).where(KYCRecord.user_id == current_user.id))
     match_score = 0
     match_success = False
     
-    if record:
+    if record and has_face_embedding(record.face_embedding):
+        # ArcFace embedding-vs-embedding compare — no IPFS fetch or decrypt
+        # needed (micro-batched with concurrent liveness calls)
+        match_success, match_score = await compare_embedding_async(live_img, record.face_embedding)
+    elif record:
+        # Default (no embedding model, or a record without an ArcFace
+        # embedding): download the document and ORB-match against it.
         try:
-            # Download and decrypt document
-            # NOTE: For large documents, this can be slow. In prod, 
-            # we'd extract and store face embeddings during upload.
-            ciphertext_b64 = await ipfs_client.download_decrypted(record.ipfs_cid)
-            # await ipfs_client.download_decrypted returns bytes (which is actually the decrypted document)
-            # Wait, download_decrypted in ipfs.py returns bytes already!
-            
-            # The ipfs_client.download_decrypted function already decrypts!
-            # Let's double check ipfs.py implementation.
-            id_doc_bytes = ciphertext_b64 
-            
-            match_success, match_score = compare_faces(data.image_b64, id_doc_bytes)
+            id_doc_bytes = await ipfs_client.download_decrypted(record.ipfs_cid)
+            match_success, match_score = await compare_faces_async(live_img, id_doc_bytes)
         except Exception as e:
             print(f"[Identity Match] Decryption/Comparison failed: {e}")
             # Fallback to just liveness if match fails due to technical error
-    
+
     # Aggregate result
     # We require both liveness and a decent face match
     aggregate_score = int((liveness_score * 0.4) + (match_score * 0.6))
@@ -214,7 +330,8 @@ async def check_liveness(
         details=f"Liveness & Face Match: score={aggregate_score}, is_live={is_live_cv}, match={match_success}",
     ))
     
-    db.commit()
+    await db.commit()
+    _status_cache.pop(current_user.id, None)
     
     msg = "Identity and liveness verified successfully." if final_success else \
           "Liveness check passed, but identity match was low. Please use a clearer ID photo." if is_live_cv else \
@@ -230,13 +347,21 @@ async def check_liveness(
 @router.get("/status", response_model=KYCStatus)
 async def get_kyc_status(
     current_user: User = Depends(require_any),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Return KYC metadata for the current user."""
-    record = db.query(KYCRecord).filter(KYCRecord.user_id == current_user.id).first()
+    """
+    Return KYC metadata for the current user.
+    Served from a 30s per-user cache; upload, liveness and bank verification
+    invalidate it in this process.
+    """
+    cached = _status_cache.get(current_user.id)
+    if cached is not None:
+        return cached
+
+    record = await db.scalar(select(KYCRecord).where(KYCRecord.user_id == current_user.id))
     if not record:
         raise HTTPException(status_code=404, detail="No KYC record found for this user")
-    return KYCStatus(
+    kyc_status = _status_cache[current_user.id] = KYCStatus(
         user_id=current_user.id,
         ipfs_cid=record.ipfs_cid,
         kyc_hash=record.kyc_hash,
@@ -247,6 +372,7 @@ async def get_kyc_status(
         liveness_score=record.liveness_score,
         liveness_verified=record.liveness_verified,
     )
+    return kyc_status
 
 
 
@@ -256,156 +382,89 @@ from app.middleware.rbac import require_bank
 @router.get("/identify")
 async def identify_document(
     current_user: User = Depends(require_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
-    Fetch & decrypt the user's KYC document from IPFS and run
-    OpenCV-based photo ID analysis:
-      - Image dimensions & resolution quality
-      - Sharpness score (Laplacian variance)
-      - Brightness & contrast
-      - Detected rectangular ID region (MRZ-style contour check)
-      - Overall confidence score
+    Photo ID analysis of the user's KYC document (see
+    services/document_analysis.py). Served from the analysis cached on the
+    KYC record at upload; legacy records are fetched from IPFS, decrypted
+    and analysed once, then back-filled.
     Returns structured analysis results to the frontend.
     """
-    import cv2
-    import numpy as np
-    import base64
-    import io
-
-    kyc = db.query(KYCRecord).filter(KYCRecord.user_id == current_user.id).first()
+    kyc = await db.scalar(select(KYCRecord).where(KYCRecord.user_id == current_user.id))
     if not kyc:
         raise HTTPException(status_code=404, detail="No KYC document found. Please upload first.")
 
-    # Fetch & decrypt from IPFS
-    try:
-        plaintext_bytes = await ipfs_client.download_decrypted(kyc.ipfs_cid)
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Could not retrieve document: {str(e)}")
+    if kyc.analysis_json is None:
+        # Fetch & decrypt from IPFS
+        try:
+            plaintext_bytes = await ipfs_client.download_decrypted(kyc.ipfs_cid)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Could not retrieve document: {str(e)}")
 
-    # Decode to OpenCV image (handle PDF as unsupported for now)
-    try:
-        nparr = np.frombuffer(plaintext_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if img is None:
-            # Likely a PDF — return basic metadata
-            return {
-                "doc_type": kyc.doc_type,
-                "format": "pdf",
-                "analysis": {
-                    "format": "PDF",
-                    "size_bytes": len(plaintext_bytes),
-                    "sharpness": None,
-                    "brightness": None,
-                    "confidence": 70,
-                    "status": "pdf_document",
-                    "message": "PDF document detected — visual analysis skipped.",
-                    "checks": {
-                        "readable": True,
-                        "proper_size": len(plaintext_bytes) > 5000,
-                    }
-                }
-            }
-    except Exception as e:
-        raise HTTPException(status_code=422, detail=f"Image decode failed: {str(e)}")
-
-    h, w = img.shape[:2]
-
-    # ── Sharpness (Laplacian variance) ────────────────────────────────────────
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-    sharpness_score = min(100, int(laplacian_var / 5))
-
-    # ── Brightness ────────────────────────────────────────────────────────────
-    brightness = int(np.mean(gray))
-
-    # ── Contrast (std deviation of gray) ─────────────────────────────────────
-    contrast = int(np.std(gray))
-
-    # ── ID card contour detection (largest rectangle) ─────────────────────────
-    edges = cv2.Canny(gray, 50, 150)
-    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    id_region_detected = False
-    id_aspect_ok = False
-    if contours:
-        largest = max(contours, key=cv2.contourArea)
-        area = cv2.contourArea(largest)
-        if area > (h * w * 0.1):   # at least 10% of image
-            x2, y2, rw, rh = cv2.boundingRect(largest)
-            aspect = rw / rh if rh > 0 else 0
-            id_region_detected = True
-            id_aspect_ok = 1.2 <= aspect <= 2.2   # typical ID card ratio
-
-    # ── Colour channels (detect greyscale / colour scan) ─────────────────────
-    b_mean, g_mean, r_mean = [int(np.mean(img[:, :, i])) for i in range(3)]
-    is_colour = not (abs(b_mean - g_mean) < 8 and abs(g_mean - r_mean) < 8)
-
-    # ── Checks ────────────────────────────────────────────────────────────────
-    proper_size = w >= 400 and h >= 250
-    not_too_dark = brightness > 40
-    not_too_bright = brightness < 220
-    sharp_enough = sharpness_score >= 15
-
-    # ── Confidence score ──────────────────────────────────────────────────────
-    score = 40
-    if sharp_enough:      score += 20
-    if proper_size:       score += 15
-    if id_region_detected: score += 15
-    if id_aspect_ok:      score += 10
-    if not_too_dark and not_too_bright: score += 10
-    confidence = min(100, score)
-
-    # ── Thumbnail (small preview, base64) ────────────────────────────────────
-    thumb = cv2.resize(img, (240, int(240 * h / w)))
-    _, thumb_buf = cv2.imencode('.jpg', thumb, [cv2.IMWRITE_JPEG_QUALITY, 70])
-    thumb_b64 = base64.b64encode(thumb_buf.tobytes()).decode()
-
-    return {
-        "doc_type": kyc.doc_type,
-        "format": "image",
-        "analysis": {
-            "width": w,
-            "height": h,
-            "format": "Image",
-            "size_bytes": len(plaintext_bytes),
-            "sharpness": sharpness_score,
-            "brightness": brightness,
-            "contrast": contrast,
-            "is_colour": is_colour,
-            "id_region_detected": id_region_detected,
-            "id_aspect_ratio_ok": id_aspect_ok,
-            "confidence": confidence,
-            "status": "pass" if confidence >= 60 else "warn" if confidence >= 40 else "fail",
-            "checks": {
-                "sharp_enough": sharp_enough,
-                "proper_size": proper_size,
-                "not_too_dark": not_too_dark,
-                "not_too_bright": not_too_bright,
-                "id_region_detected": id_region_detected,
-                "colour_scan": is_colour,
-            },
-            "thumbnail_b64": thumb_b64,
-        }
-    }
+        try:
+            result = await asyncio.to_thread(analyze_document, plaintext_bytes)
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Image decode failed: {str(e)}")
+
+        kyc.analysis_json, kyc.thumbnail_b64 = _split_analysis(result)
+        await db.commit()
+
+    result = json.loads(kyc.analysis_json)
+    if kyc.thumbnail_b64 is not None:
+        result["analysis"]["thumbnail_b64"] = kyc.thumbnail_b64
+    return {"doc_type": kyc.doc_type, **result}
+
+
+_DOC_EXTENSIONS = {
+    "application/pdf": ".pdf",
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "application/octet-stream": "",
+}
+
+
+def _doc_media_type(data: bytes) -> str:
+    """Content-Type of a decrypted document, from its magic bytes."""
+    if data[:4] == b"%PDF":
+        return "application/pdf"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    return "application/octet-stream"
+
+
+async def _granted_consent_with_kyc(db: AsyncSession, consent_id: str, bank_id: str):
+    """
+    (consent, kyc) for a granted consent owned by `bank_id`, in one query.
+    The KYC side is an outer join, so a missing document still returns the
+    consent (kyc=None); no matching consent returns (None, None).
+    """
+    row = (await db.execute(
+        select(ConsentRecord, KYCRecord)
+        .outerjoin(KYCRecord, KYCRecord.user_id == ConsentRecord.user_id)
+        .where(
+            ConsentRecord.id == consent_id,
+            ConsentRecord.bank_id == bank_id,
+            ConsentRecord.status == ConsentStatus.granted,
+        )
+    )).first()
+    return row if row else (None, None)
 
 
 @router.post("/verify/{consent_id}")
 async def bank_verify_kyc(
     consent_id: str,
     current_user: User = Depends(require_bank),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     request: Request = None,
 ):
     """Bank with active consent marks a user's KYC as verified/accepted."""
-    consent = db.query(ConsentRecord).filter(
-        ConsentRecord.id == consent_id,
-        ConsentRecord.bank_id == current_user.id,
-        ConsentRecord.status == ConsentStatus.granted,
-    ).first()
+    consent, kyc = await _granted_consent_with_kyc(db, consent_id, current_user.id)
     if not consent:
         raise HTTPException(status_code=403, detail="No active consent for this user. Cannot verify.")
 
-    kyc = db.query(KYCRecord).filter(KYCRecord.user_id == consent.user_id).first()
     if not kyc:
         raise HTTPException(status_code=404, detail="No KYC record found for this user.")
 
@@ -420,7 +479,8 @@ async def bank_verify_kyc(
         ip_address=request.client.host if request and request.client else None,
         details=f"Bank '{current_user.email}' accepted/verified KYC for consent {consent_id}",
     ))
-    db.commit()
+    await db.commit()
+    _status_cache.pop(consent.user_id, None)
     return {"message": "KYC accepted and verified. ✅", "consent_id": consent_id}
 
 
@@ -429,15 +489,15 @@ async def bank_reject_kyc(
     consent_id: str,
     reason: str = "",
     current_user: User = Depends(require_bank),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     request: Request = None,
 ):
     """Bank rejects a user's KYC with an optional reason."""
-    consent = db.query(ConsentRecord).filter(
+    consent = await db.scalar(select(ConsentRecord).where(
         ConsentRecord.id == consent_id,
         ConsentRecord.bank_id == current_user.id,
         ConsentRecord.status == ConsentStatus.granted,
-    ).first()
+    ))
     if not consent:
         raise HTTPException(status_code=403, detail="No active consent for this user. Cannot reject.")
 
@@ -452,7 +512,7 @@ async def bank_reject_kyc(
         ip_address=request.client.host if request and request.client else None,
         details=f"Bank '{current_user.email}' rejected KYC: {reason}",
     ))
-    db.commit()
+    await db.commit()
     return {"message": "KYC rejected.", "consent_id": consent_id, "reason": reason}
 
 
@@ -460,22 +520,18 @@ async def bank_reject_kyc(
 async def bank_view_document(
     consent_id: str,
     current_user: User = Depends(require_bank),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     request: Request = None,
 ):
     """
     Bank retrieves the decrypted KYC document for a user they have active consent for.
-    Returns base64-encoded document bytes + content-type.
+    Returns the raw document bytes with a sniffed Content-Type (no base64
+    inflation); document metadata comes from /consent/request-detail.
     """
-    consent = db.query(ConsentRecord).filter(
-        ConsentRecord.id == consent_id,
-        ConsentRecord.bank_id == current_user.id,
-        ConsentRecord.status == ConsentStatus.granted,
-    ).first()
+    consent, kyc = await _granted_consent_with_kyc(db, consent_id, current_user.id)
     if not consent:
         raise HTTPException(status_code=403, detail="No active consent. Cannot view document.")
 
-    kyc = db.query(KYCRecord).filter(KYCRecord.user_id == consent.user_id).first()
     if not kyc:
         raise HTTPException(status_code=404, detail="No KYC document found.")
 
@@ -485,9 +541,6 @@ async def bank_view_document(
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Failed to retrieve document from IPFS: {str(e)}")
 
-    import base64
-    doc_b64 = base64.b64encode(plaintext_bytes).decode()
-
     # Audit the access
     db.add(AuditLog(
         id=str(uuid.uuid4()),
@@ -497,13 +550,19 @@ async def bank_view_document(
         ip_address=request.client.host if request and request.client else None,
         details=f"Bank '{current_user.email}' viewed document for consent {consent_id}",
     ))
-    db.commit()
-
-    return {
-        "doc_type": kyc.doc_type,
-        "doc_b64": doc_b64,
-        "uploaded_at": kyc.uploaded_at.isoformat() if kyc.uploaded_at else None,
-    }
+    await db.commit()
+
+    media_type = _doc_media_type(plaintext_bytes)
+    return Response(
+        # memoryview: Starlette sends bytes/memoryview as-is — no copy of the bytearray
+        content=memoryview(plaintext_bytes),
+        media_type=media_type,
+        headers={
+            # Fixed name — never echo the user-supplied doc_type into a header
+            "Content-Disposition": f'inline; filename="kyc-document{_DOC_EXTENSIONS[media_type]}"',
+            "Cache-Control": "no-store",     # decrypted PII — never cache
+        },
+    )
 
 
 @router.post("/request-more-docs/{consent_id}")
@@ -511,15 +570,15 @@ async def bank_request_more_docs(
     consent_id: str,
     message: str = "Please upload an additional document for verification.",
     current_user: User = Depends(require_bank),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     request: Request = None,
 ):
     """Bank sends a request to the user to upload additional documents."""
-    consent = db.query(ConsentRecord).filter(
+    consent = await db.scalar(select(ConsentRecord).where(
         ConsentRecord.id == consent_id,
         ConsentRecord.bank_id == current_user.id,
         ConsentRecord.status == ConsentStatus.granted,
-    ).first()
+    ))
     if not consent:
         raise HTTPException(status_code=403, detail="No active consent for this user.")
 
@@ -533,5 +592,5 @@ async def bank_request_more_docs(
         ip_address=request.client.host if request and request.client else None,
         details=f"Bank '{current_user.email}' requested additional docs: {message}",
     ))
-    db.commit()
+    await db.commit()
     return {"message": "Document request sent to user. ✅", "consent_id": consent_id}
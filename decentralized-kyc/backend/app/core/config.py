@@ -17,6 +17,7 @@ class Settings(BaseSettings):
     APP_NAME: str = "Decentralized KYC"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = False
+    TESTING: bool = False                # Test suites / CI: cheap bcrypt etc.
     CORS_ALLOW_ALL: bool = False         # Set True in dev/Render if origins vary
     ALLOWED_ORIGINS: List[str] = [
         "http://localhost:3000",
@@ -29,6 +30,9 @@ class Settings(BaseSettings):
 
     # ── Database ─────────────────────────────────────────────────────────────
     DATABASE_URL: str = "sqlite:///./kyc.db"       # Swap to postgres:// in prod
+    # Postgres connection pool (per engine, per worker process). Ignored for SQLite.
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
 
     # ── Security: JWT ────────────────────────────────────────────────────────
     # SECURITY: Use a 256-bit random secret. Never commit this value.
@@ -37,6 +41,24 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
+    # ── Security: Passwords ──────────────────────────────────────────────────
+    # bcrypt work factor (2^cost rounds). 12 ≈ 250ms on a modern core (OWASP).
+    # Lower only for CI / low-power dev boxes; startup logs the measured cost.
+    BCRYPT_COST: int = 12
+    # Re-hash stored passwords still on an older cost at the next successful
+    # login. Disable for bulk test runs where the extra hash is pure overhead.
+    BCRYPT_REHASH_ON_LOGIN: bool = True
+
+    # Optional bcrypt hash for the seeded demo bank's password, precomputed so
+    # first boot never hashes. Generate:
+    # python -c "import bcrypt; print(bcrypt.hashpw(b'BankAdmin123!', bcrypt.gensalt(12)).decode())"
+    SEED_BANK_PASSWORD_HASH: str = ""
+
+    @property
+    def BCRYPT_ROUNDS(self) -> int:
+        """Effective bcrypt cost: the bcrypt minimum (4) under TESTING, else BCRYPT_COST."""
+        return 4 if self.TESTING else self.BCRYPT_COST
+
     # ── Security: AES-256 ────────────────────────────────────────────────────
     # SECURITY: 32-byte key for AES-256. Must be securely rotated in prod.
     # Generate: python -c "import secrets; print(secrets.token_hex(32))"
@@ -51,8 +73,23 @@ class Settings(BaseSettings):
 
     # ── IPFS ─────────────────────────────────────────────────────────────────
     IPFS_API_URL: str = "http://localhost:5001"   # Local Kubo IPFS node
+    # Optional: path to Kubo's API Unix socket (Addresses.API = /unix/...).
+    # When set, API calls bypass the loopback TCP stack entirely.
+    IPFS_API_SOCKET: str = ""
     # Optional: INFURA_IPFS_URL + INFURA_PROJECT_ID / SECRET for cloud IPFS
 
+    # ── Face Matching ────────────────────────────────────────────────────────
+    # Optional ArcFace ONNX model (e.g. arcface r50, int8-quantised) used for
+    # 512-d face embeddings. Requires onnxruntime. Empty = built-in embedding.
+    FACE_MODEL_PATH: str = ""
+    # Optional YuNet ONNX face detector (cv2.FaceDetectorYN) for liveness,
+    # e.g. face_detection_yunet_2023mar_int8.onnx. Empty = Haar cascades.
+    FACE_DETECTOR_MODEL_PATH: str = ""
+
+    # ── Fraud Detection ──────────────────────────────────────────────────────
+    # Optional file of known-fraudulent document SHA-256 digests (hex, one per line)
+    FRAUD_HASHES_FILE: str = ""
+
     # ── KYC Business Rules ───────────────────────────────────────────────────
     KYC_DEFAULT_VALIDITY_DAYS: int = 365     # 1-year KYC before re-verification
     MAX_DOCUMENT_SIZE_MB: int = 10
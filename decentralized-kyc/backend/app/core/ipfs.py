@@ -17,17 +17,46 @@ filesystem if the IPFS API is unreachable.
 """
 
 import os
+import uuid
+import hashlib
 import aiohttp
 import base64
 import json
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional, Tuple
+
+from aiohttp.payload import AsyncIterablePayload
 
 from app.core.config import get_settings
-from app.core.security import encrypt_to_b64, decrypt_from_b64
+from app.core.security import encrypt_stream, StreamDecryptor
 
 settings = get_settings()
 
+# API endpoints, resolved once at import (settings don't change at runtime)
+_IPFS_ADD_URL = f"{settings.IPFS_API_URL}/api/v0/add"
+_IPFS_CAT_URL = f"{settings.IPFS_API_URL}/api/v0/cat"
+_IPFS_PIN_URL = f"{settings.IPFS_API_URL}/api/v0/pin/add"
+
+# Plaintext is fed to the encryptor in 1 MiB slices (zero-copy memoryviews)
+_STREAM_CHUNK_SIZE = 1024 * 1024
+# Ciphertext is read back from IPFS / disk in 64 KiB chunks
+_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_chunks(data: bytes, hasher=None) -> Iterator[memoryview]:
+    """1 MiB plaintext slices; optionally fed to `hasher` on the way past."""
+    view = memoryview(data)
+    for i in range(0, len(view), _STREAM_CHUNK_SIZE):
+        chunk = view[i:i + _STREAM_CHUNK_SIZE]
+        if hasher is not None:
+            hasher.update(chunk)
+        yield chunk
+
+
+async def _aiter(blocks: Iterator[bytes]):
+    for block in blocks:
+        yield block
+
 
 class IPFSClient:
     """
@@ -38,64 +67,110 @@ class IPFSClient:
 
     def __init__(self):
         self.api_url = settings.IPFS_API_URL
+        self.api_socket = settings.IPFS_API_SOCKET
+        self._session: Optional[aiohttp.ClientSession] = None
         self.mock_dir = Path("data/ipfs_mock")
         self.mock_dir.mkdir(parents=True, exist_ok=True)
 
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Shared HTTP session to the Kubo API, created lazily on first use so it
+        binds to the running event loop. Keep-alive connections are reused
+        across calls. Over a Unix socket when IPFS_API_SOCKET is configured
+        (same-host node), otherwise pooled TCP to IPFS_API_URL.
+        """
+        if self._session is None or self._session.closed:
+            if self.api_socket:
+                connector = aiohttp.UnixConnector(path=self.api_socket, limit=32, keepalive_timeout=30)
+            else:
+                connector = aiohttp.TCPConnector(limit=32, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self) -> None:
+        """Close the shared session. Called from the app lifespan on shutdown."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
     async def upload_encrypted(self, plaintext_bytes: bytes) -> str:
         """
         Encrypt plaintext document bytes and upload to IPFS (or local fallback).
+        Returns the CID — see upload_encrypted_with_digest.
+        """
+        cid, _ = await self.upload_encrypted_with_digest(plaintext_bytes)
+        return cid
+
+    async def upload_encrypted_with_digest(
+        self, plaintext_bytes: bytes, with_digest: bool = True
+    ) -> Tuple[str, Optional[bytes]]:
+        """
+        Encrypt plaintext document bytes and upload to IPFS (or local fallback).
 
         Steps:
-          1. AES-256-GCM encrypt the raw document bytes.
-          2. Base64-encode the nonce+ciphertext blob.
-          3. POST this string to the IPFS node via the /api/v0/add endpoint.
-          4. Return the CID (Content Identifier) of the uploaded blob.
+          1. AES-256-GCM encrypt the raw document bytes, chunk by chunk.
+          2. Stream the binary nonce+ciphertext+tag blob into the
+             /api/v0/add multipart body.
+          3. Return the CID (Content Identifier) of the uploaded blob.
+
+        No full-size ciphertext copy is ever materialised — each chunk flows
+        plaintext → encryptor → socket (or mock file). With `with_digest`,
+        the plaintext SHA-256 is computed over the same chunks while they're
+        cache-hot, so callers (fraud scan) never make a separate pass over
+        the document; without it nothing is hashed.
 
         Returns:
-            IPFS CID string (e.g. "QmXoypiz...")
+            (IPFS CID string (e.g. "QmXoypiz..."), raw plaintext SHA-256 or None)
         """
-        # Step 1 & 2: Encrypt
-        encrypted_b64 = encrypt_to_b64(plaintext_bytes)
-        ciphertext_bytes = encrypted_b64.encode()
-
-        # Step 3: Upload to IPFS (with fallback)
-        url = f"{self.api_url}/api/v0/add"
+        # Steps 1–3: Encrypt + upload to IPFS (with fallback)
         try:
-            async with aiohttp.ClientSession() as session:
-                form = aiohttp.FormData()
-                form.add_field(
-                    "file",
-                    ciphertext_bytes,
-                    filename="kyc_encrypted.bin",
+            session = await self._get_session()
+            doc_hasher = hashlib.sha256() if with_digest else None
+            with aiohttp.MultipartWriter("form-data") as form:
+                part = form.append_payload(AsyncIterablePayload(
+                    _aiter(encrypt_stream(_iter_chunks(plaintext_bytes, doc_hasher))),
                     content_type="application/octet-stream",
-                )
-                # Apply a short timeout for the check
-                async with session.post(url, data=form, timeout=5) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        return data["Hash"]
-                    else:
-                        print(f"[IPFS] API error {resp.status}, using local fallback")
+                ))
+                part.set_content_disposition("form-data", name="file", filename="kyc_encrypted.bin")
+            # Apply a short timeout for the check
+            async with session.post(_IPFS_ADD_URL, data=form, timeout=5) as resp:
+                if resp.status == 200:
+                    data = await resp.json()
+                    return data["Hash"], doc_hasher.digest() if doc_hasher else None
+                else:
+                    print(f"[IPFS] API error {resp.status}, using local fallback")
         except Exception as e:
             print(f"[IPFS] Connection failed ({e}), using local filesystem fallback")
 
         # Fallback: Local Storage
-        # We generate a deterministic CID-like hash for the mock storage
-        import hashlib
-        cid = f"mock-{hashlib.sha256(ciphertext_bytes).hexdigest()[:16]}"
-        file_path = self.mock_dir / cid
-        file_path.write_bytes(ciphertext_bytes)
-        
-        return cid
+        # Stream to a temp file while hashing, then rename to a deterministic
+        # CID-like name derived from the ciphertext.
+        # (A failed attempt may have consumed part of the stream, so the
+        # plaintext digest restarts here too.)
+        hasher = hashlib.sha256()
+        doc_hasher = hashlib.sha256() if with_digest else None
+        tmp_path = self.mock_dir / f".upload-{uuid.uuid4().hex}"
+        with open(tmp_path, "wb") as f:
+            for block in encrypt_stream(_iter_chunks(plaintext_bytes, doc_hasher)):
+                hasher.update(block)
+                f.write(block)
+        cid = f"mock-{hasher.hexdigest()[:16]}"
+        tmp_path.replace(self.mock_dir / cid)
+
+        return cid, doc_hasher.digest() if doc_hasher else None
 
     async def download_decrypted(self, cid: str) -> bytes:
         """
         Download ciphertext from IPFS (or local) and decrypt.
 
         Steps:
-          1. Fetch the raw blob from IPFS using CID.
-          2. Base64-decode to get nonce+ciphertext.
-          3. AES-256-GCM decrypt and return plaintext bytes.
+          1. Stream the blob from IPFS (or the mock file) using CID.
+          2. AES-256-GCM decrypt each chunk as it arrives (legacy base64
+             blobs are decoded on the fly).
+          3. Verify the tag and return the plaintext (bytes-like).
+
+        Only the plaintext is accumulated — the full ciphertext is never
+        buffered.
 
         SECURITY: GCM's authentication tag validation happens here —
         any tampering with the ciphertext on IPFS will raise InvalidTag.
@@ -104,26 +179,32 @@ class IPFSClient:
             file_path = self.mock_dir / cid
             if not file_path.exists():
                 raise RuntimeError(f"Local mock file not found: {cid}")
-            ciphertext_bytes = file_path.read_bytes()
-        else:
-            url = f"{self.api_url}/api/v0/cat?arg={cid}"
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url, timeout=5) as resp:
-                        if resp.status != 200:
-                            raise RuntimeError(f"IPFS fetch failed [{resp.status}]")
-                        ciphertext_bytes = await resp.read()
-            except Exception as e:
-                # If we have a mock file with this name (unlikely but possible during dev transitions)
-                file_path = self.mock_dir / cid
-                if file_path.exists():
-                    ciphertext_bytes = file_path.read_bytes()
-                else:
-                    raise RuntimeError(f"IPFS unavailable and no local fallback found: {e}")
+            return self._decrypt_file(file_path)
+
+        decryptor = StreamDecryptor()
+        try:
+            session = await self._get_session()
+            async with session.post(_IPFS_CAT_URL, params={"arg": cid}, timeout=5) as resp:
+                if resp.status != 200:
+                    raise RuntimeError(f"IPFS fetch failed [{resp.status}]")
+                async for chunk in resp.content.iter_chunked(_DOWNLOAD_CHUNK_SIZE):
+                    decryptor.update(chunk)
+        except Exception as e:
+            # If we have a mock file with this name (unlikely but possible during dev transitions)
+            file_path = self.mock_dir / cid
+            if file_path.exists():
+                return self._decrypt_file(file_path)
+            raise RuntimeError(f"IPFS unavailable and no local fallback found: {e}")
+
+        return decryptor.finalize()
 
-        # Step 2 & 3: Decrypt
-        encrypted_b64 = ciphertext_bytes.decode()
-        return decrypt_from_b64(encrypted_b64)
+    @staticmethod
+    def _decrypt_file(file_path: Path) -> bytes:
+        decryptor = StreamDecryptor()
+        with open(file_path, "rb") as f:
+            while chunk := f.read(_DOWNLOAD_CHUNK_SIZE):
+                decryptor.update(chunk)
+        return decryptor.finalize()
 
     async def pin(self, cid: str) -> bool:
         """
@@ -133,11 +214,10 @@ class IPFSClient:
         if str(cid).startswith("mock-"):
             return True
             
-        url = f"{self.api_url}/api/v0/pin/add?arg={cid}"
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, timeout=2) as resp:
-                    return resp.status == 200
+            session = await self._get_session()
+            async with session.post(_IPFS_PIN_URL, params={"arg": cid}, timeout=2) as resp:
+                return resp.status == 200
         except:
             return True # Assume success for mock/local
 
@@ -18,6 +18,7 @@ SECURITY DESIGN CHOICES:
  │    (60 min default) with clear role claim to enforce RBAC.            │
  │                                                                       │
  │ 4. bcrypt       — Used to hash passwords. Work factor 12 (≥2024 rec) │
+ │    by default, tunable via BCRYPT_COST.                               │
  │                                                                       │
  │ 5. Digital Signatures — Consent grants include a signature from the  │
  │    user's Ethereum private key (client-side). Backend verifies the    │
@@ -29,45 +30,75 @@ SECURITY DESIGN CHOICES:
 import os
 import hashlib
 import base64
+import threading
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
+import bcrypt
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from eth_account import Account
-from eth_account.messages import encode_defunct
+import jwt
+from eth_keys import keys
+from eth_utils import keccak
 
 from app.core.config import get_settings
 
 settings = get_settings()
 
+# Exception surface for token validation (expired, bad signature, malformed)
+JWTError = jwt.PyJWTError
+
 # ── Password Hashing ─────────────────────────────────────────────────────────
 # SECURITY: bcrypt with cost factor 12 is the 2024 OWASP recommendation.
-_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
+# Configurable via BCRYPT_COST for deployments with different CPU budgets;
+# TESTING=1 drops to cost 4 (256× cheaper) for test suites and CI.
+# bcrypt is called directly (no passlib dispatch layer); hashes are the
+# standard "$2b$" format, so ones written by passlib verify unchanged.
 
 
 def hash_password(plain: str) -> str:
-    return _pwd_context.hash(plain)
+    return bcrypt.hashpw(plain.encode(), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode()
 
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return _pwd_context.verify(plain, hashed)
+    try:
+        return bcrypt.checkpw(plain.encode(), hashed.encode())
+    except ValueError:      # malformed / non-bcrypt hash
+        return False
+
+
+def password_needs_rehash(hashed: str) -> bool:
+    """
+    True if `hashed` was produced with a lower bcrypt cost than BCRYPT_ROUNDS.
+    bcrypt strings look like "$2b$12$<salt+hash>" — the cost is the 2nd field.
+    """
+    try:
+        return int(hashed.split("$")[2]) < settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
 
 
 # ── AES-256-GCM Encryption ───────────────────────────────────────────────────
-def _get_aes_key() -> bytes:
+def _parse_aes_key(hex_key: str) -> bytes:
     """
     Derive 32-byte AES key from the hex-encoded env variable.
     SECURITY: The key must be exactly 32 bytes for AES-256.
     In production, replace with AWS KMS / Azure Key Vault / HSM.
     """
-    raw = bytes.fromhex(settings.AES_ENCRYPTION_KEY)
+    raw = bytes.fromhex(hex_key)
     if len(raw) != 32:
         raise ValueError("AES_ENCRYPTION_KEY must be exactly 32 bytes (64 hex chars)")
     return raw
 
 
+# The key is fixed for the process lifetime: parse + validate it once at import
+# (a bad key fails startup, not the first upload) and expand the AES-GCM key
+# schedule once. AESGCM is stateless between calls (the nonce is per-call),
+# so the one instance is safe to use from every thread.
+_AES_KEY = _parse_aes_key(settings.AES_ENCRYPTION_KEY)
+_AESGCM = AESGCM(_AES_KEY)
+
+
 def encrypt_document(plaintext: bytes) -> tuple[bytes, bytes]:
     """
     Encrypt document bytes using AES-256-GCM.
@@ -76,13 +107,15 @@ def encrypt_document(plaintext: bytes) -> tuple[bytes, bytes]:
     GCM authentication tag (16 bytes) is appended by the AESGCM class.
     The nonce is prepended to the ciphertext and must be stored alongside it.
 
+    PERF: the shared AESGCM instance goes straight to OpenSSL's EVP AES-GCM
+    (AES-NI + PCLMUL) with the key schedule already expanded, so small
+    payloads pay only the EVP call itself.
+
     Returns:
         (nonce, ciphertext_with_tag)
     """
-    key = _get_aes_key()
     nonce = os.urandom(12)          # 96-bit nonce — NEVER reuse with same key
-    aesgcm = AESGCM(key)
-    ciphertext = aesgcm.encrypt(nonce, plaintext, None)
+    ciphertext = _AESGCM.encrypt(nonce, plaintext, None)
     return nonce, ciphertext
 
 
@@ -91,9 +124,7 @@ def decrypt_document(nonce: bytes, ciphertext: bytes) -> bytes:
     Decrypt AES-256-GCM ciphertext.
     Raises InvalidTag if the ciphertext was tampered with (integrity check).
     """
-    key = _get_aes_key()
-    aesgcm = AESGCM(key)
-    return aesgcm.decrypt(nonce, ciphertext, None)
+    return _AESGCM.decrypt(nonce, ciphertext, None)
 
 
 def encrypt_to_b64(plaintext: bytes) -> str:
@@ -102,36 +133,139 @@ def encrypt_to_b64(plaintext: bytes) -> str:
     The nonce is the first 12 bytes of the decoded blob.
     """
     nonce, ciphertext = encrypt_document(plaintext)
-    combined = nonce + ciphertext
-    return base64.b64encode(combined).decode()
+    # 12-byte nonce = exactly 16 base64 chars (no padding), so the two
+    # encodings concatenate to base64(nonce || ciphertext) without ever
+    # building that plaintext-sized concatenation.
+    return (base64.b64encode(nonce) + base64.b64encode(ciphertext)).decode()
+
+
+# Stored-blob format marker: raw blobs start with a NUL byte, which can never
+# occur in the base64 text written by earlier versions (and by encrypt_to_b64).
+_RAW_MAGIC = b"\x00\x01"
+
+
+def encrypt_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    AES-256-GCM encrypt `chunks` and yield the stored blob incrementally:
+    _RAW_MAGIC || nonce || ciphertext || tag, as raw bytes. IPFS stores
+    binary fine, so there is no base64 step (−25% bytes on the wire and at
+    rest). Only one chunk is held at a time. StreamDecryptor reads it back.
+    """
+    nonce = os.urandom(12)          # 96-bit nonce — NEVER reuse with same key
+    encryptor = Cipher(algorithms.AES(_AES_KEY), modes.GCM(nonce)).encryptor()
+
+    yield _RAW_MAGIC + nonce
+    for chunk in chunks:
+        block = encryptor.update(chunk)
+        if block:
+            yield block
+    yield encryptor.finalize() + encryptor.tag
 
 
 def decrypt_from_b64(b64_blob: str) -> bytes:
     """
     Convenience: base64-decode, split nonce (first 12 bytes) and decrypt.
     """
-    combined = base64.b64decode(b64_blob)
-    nonce, ciphertext = combined[:12], combined[12:]
-    return decrypt_document(nonce, ciphertext)
+    # memoryview slices: AESGCM takes any bytes-like, so the ciphertext is
+    # never copied out of the decoded blob
+    combined = memoryview(base64.b64decode(b64_blob))
+    return decrypt_document(combined[:12], combined[12:])
+
+
+class StreamDecryptor:
+    """
+    Incremental inverse of encrypt_stream: feed a stored blob in arbitrary
+    chunks with update(), then call finalize(). Both the raw format and the
+    legacy base64(nonce || ciphertext || tag) format are accepted — the
+    first byte tells them apart.
+
+    Ciphertext is decrypted as it arrives, so the downloaded blob is never
+    held in full. Plaintext is only released by finalize(), AFTER the GCM
+    tag verifies — unauthenticated bytes never leave this object.
+    Raises InvalidTag on tampering.
+    """
+
+    _NONCE_LEN = 12
+    _TAG_LEN = 16
+
+    def __init__(self):
+        self._raw: Optional[bool] = None    # format, decided on the first bytes
+        self._head = b""                    # bytes seen before the format is known
+        self._b64_carry = b""               # base64 chars not yet forming a 4-char group
+        self._held = bytearray()            # nonce, then the trailing bytes that may be the tag
+        self._decryptor = None
+        self._plaintext = bytearray()
+
+    def update(self, chunk: bytes) -> None:
+        if self._raw is None:
+            self._head += chunk
+            if not self._head or (self._head[0] == 0 and len(self._head) < len(_RAW_MAGIC)):
+                return
+            self._raw = self._head.startswith(_RAW_MAGIC)
+            chunk = self._head[len(_RAW_MAGIC):] if self._raw else self._head
+            self._head = b""
+
+        if self._raw:
+            self._held += chunk
+        else:
+            data = self._b64_carry + chunk
+            cut = len(data) - len(data) % 4
+            self._b64_carry = data[cut:]
+            self._held += base64.b64decode(data[:cut])
+
+        if self._decryptor is None:
+            if len(self._held) < self._NONCE_LEN:
+                return
+            nonce = bytes(self._held[:self._NONCE_LEN])
+            del self._held[:self._NONCE_LEN]
+            self._decryptor = Cipher(algorithms.AES(_AES_KEY), modes.GCM(nonce)).decryptor()
+
+        # Always keep the last 16 bytes back — they may be the tag
+        ready = len(self._held) - self._TAG_LEN
+        if ready > 0:
+            self._plaintext += self._decryptor.update(self._held[:ready])
+            del self._held[:ready]
+
+    def finalize(self) -> bytearray:
+        """Verify the tag and return the plaintext (a bytearray, no extra copy)."""
+        if self._b64_carry or self._decryptor is None or len(self._held) < self._TAG_LEN:
+            raise ValueError("Encrypted blob is truncated")
+        self._plaintext += self._decryptor.finalize_with_tag(bytes(self._held))
+        return self._plaintext
 
 
 # ── SHA-256 Hashing ──────────────────────────────────────────────────────────
+_tls = threading.local()
+
+
+def _sha256(data: str | bytes):
+    """
+    SHA-256 hasher over `data`, cloned from a per-thread empty template.
+    copy() skips the OpenSSL digest fetch + context setup that dominates
+    hashing inputs as small as a CID.
+    """
+    template = getattr(_tls, "sha256", None)
+    if template is None:
+        template = _tls.sha256 = hashlib.sha256()
+    h = template.copy()
+    h.update(data.encode() if isinstance(data, str) else data)
+    return h
+
+
 def sha256_hex(data: str | bytes) -> str:
     """
     SHA-256 hash of data.
     SECURITY: Used to hash IPFS CIDs before storing on the blockchain.
     Ensures no raw identifiers (PII-adjacent) are ever on-chain.
     """
-    if isinstance(data, str):
-        data = data.encode()
-    return hashlib.sha256(data).hexdigest()
+    return _sha256(data).hexdigest()
 
 
 def sha256_bytes32(data: str | bytes) -> bytes:
     """
     Returns SHA-256 hash as bytes32 (for Solidity bytes32 parameter).
     """
-    return bytes.fromhex(sha256_hex(data))
+    return _sha256(data).digest()
 
 
 # ── JWT Tokens ───────────────────────────────────────────────────────────────
@@ -148,7 +282,8 @@ def create_access_token(
       - wallet_address is included for linking JWT identity to blockchain identity.
       - Short expiry (ACCESS_TOKEN_EXPIRE_MINUTES) limits blast radius of theft.
     """
-    expire = datetime.now(timezone.utc) + (
+    now = datetime.now(timezone.utc)
+    expire = now + (
         expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     payload = {
@@ -156,7 +291,7 @@ def create_access_token(
         "role": role,             # "user" | "bank" | "validator"
         "wallet": wallet_address, # Ethereum address (optional)
         "exp": expire,
-        "iat": datetime.now(timezone.utc),
+        "iat": now,
     }
     return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
 
@@ -173,6 +308,11 @@ def decode_access_token(token: str) -> dict:
 
 
 # ── Ethereum Signature Verification ──────────────────────────────────────────
+# EIP-191 version 0x45 ("personal_sign") prefix; followed by the decimal
+# byte length of the message, then the message itself
+_EIP191_PREFIX = b"\x19Ethereum Signed Message:\n"
+
+
 def verify_eth_signature(message: str, signature: str, expected_address: str) -> bool:
     """
     Verify that `signature` was produced by the private key belonging to `expected_address`.
@@ -193,9 +333,20 @@ def verify_eth_signature(message: str, signature: str, expected_address: str) ->
     Returns:
         True if the signature is valid and was made by expected_address.
     """
+    # PERF: equivalent to Account.recover_message(encode_defunct(text=...)),
+    # but hashes the EIP-191 personal_sign payload directly and recovers via
+    # eth_keys — no SignableMessage / HexBytes wrapping per request.
     try:
-        msg = encode_defunct(text=message)
-        recovered = Account.recover_message(msg, signature=signature)
+        raw = bytes.fromhex(signature.removeprefix("0x"))
+        if len(raw) != 65:
+            return False
+        v = raw[64]
+        if v >= 27:
+            v -= 27
+        sig = keys.Signature(signature_bytes=raw[:64] + bytes([v]))
+        payload = message.encode()
+        msg_hash = keccak(_EIP191_PREFIX + str(len(payload)).encode() + payload)
+        recovered = sig.recover_public_key_from_msg_hash(msg_hash).to_address()
         return recovered.lower() == expected_address.lower()
     except Exception:
         return False
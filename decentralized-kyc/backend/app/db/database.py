@@ -12,23 +12,65 @@ Schema Overview:
 from datetime import datetime, timezone
 from sqlalchemy import (
     create_engine, Column, String, Boolean, DateTime,
-    Integer, Text, ForeignKey, Enum
+    Integer, Text, ForeignKey, Enum, Index, LargeBinary
 )
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 import enum
 
 from app.core.config import get_settings
 
 settings = get_settings()
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}  # SQLite only; remove for Postgres
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_IS_SQLITE = settings.DATABASE_URL.startswith("sqlite")
+
+if _IS_SQLITE:
+    # Dev: file DB shared across the threadpool
+    engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args={"check_same_thread": False}
+    )
+else:
+    # Prod (Postgres): sized, health-checked pool so requests reuse warm
+    # connections instead of paying a TCP/TLS + auth handshake each time.
+    engine = create_engine(
+        settings.DATABASE_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
+# expire_on_commit=False: handlers read back ids/fields of rows they just wrote
+# (response bodies, background-task args) — without this each access after
+# commit would trigger a reload SELECT.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
 
+def _async_url(url: str) -> str:
+    """Map the sync DATABASE_URL onto its asyncio driver (asyncpg / aiosqlite)."""
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    return url
+
+
+# Async engine for the audit, consent and KYC routers: DB waits yield to the
+# event loop instead of blocking it.
+# asyncpg additionally keeps a per-connection prepared-statement cache.
+async_engine = create_async_engine(
+    _async_url(settings.DATABASE_URL),
+    **({} if _IS_SQLITE else dict(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )),
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
 # ── Enums ─────────────────────────────────────────────────────────────────────
 class UserRole(str, enum.Enum):
     user = "user"
@@ -79,7 +121,7 @@ class KYCRecord(Base):
     __table_args__ = {"extend_existing": True}
 
     id             = Column(String, primary_key=True)           # UUID
-    user_id        = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    user_id        = Column(String, ForeignKey("users.id"), nullable=False, index=True, unique=True)
     ipfs_cid       = Column(String, nullable=False)             # Encrypted doc CID
     kyc_hash       = Column(String, nullable=False)             # SHA-256(CID) stored on chain
     tx_hash        = Column(String, nullable=True)              # Blockchain TX hash
@@ -90,17 +132,32 @@ class KYCRecord(Base):
     fraud_score    = Column(Integer, nullable=True)             # 0-100 from AI scanner
     liveness_score = Column(Integer, nullable=True)             # 0-100 from CV scanner
     liveness_verified = Column(Boolean, default=False)
+    # float32 ArcFace embedding (512-d) of the ID photo, computed once at upload.
+    # NULL = no embedding model loaded or no face found — /liveness then
+    # ORB-matches against the document itself.
+    face_embedding = Column(LargeBinary, nullable=True)
+    # /identify analysis (JSON) + JPEG preview, computed once at upload —
+    # the document is immutable for the record's lifetime. NULL = legacy row.
+    analysis_json  = Column(Text, nullable=True)
+    thumbnail_b64  = Column(Text, nullable=True)
 
     user           = relationship("User", back_populates="kyc_record")
 
 
 class ConsentRecord(Base):
     __tablename__ = "consent_records"
-    __table_args__ = {"extend_existing": True}
+    # Consent lookups are (user, bank[, status]) pairs or a bank's list by
+    # status. The composites' leading columns also serve plain user_id /
+    # bank_id filters, so those columns carry no single-column index.
+    __table_args__ = (
+        Index("ix_consent_user_bank_status", "user_id", "bank_id", "status"),
+        Index("ix_consent_bank_status", "bank_id", "status"),
+        {"extend_existing": True},
+    )
 
     id             = Column(String, primary_key=True)           # UUID
-    user_id        = Column(String, ForeignKey("users.id"), nullable=False, index=True)
-    bank_id        = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    user_id        = Column(String, ForeignKey("users.id"), nullable=False)
+    bank_id        = Column(String, ForeignKey("users.id"), nullable=False)
     status         = Column(Enum(ConsentStatus), default=ConsentStatus.pending)
     tx_hash        = Column(String, nullable=True)              # Grant/revoke TX hash
     requested_at   = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -120,7 +177,14 @@ class ConsentRecord(Base):
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
-    __table_args__ = {"extend_existing": True}
+    # Composite indexes match the RBAC filters in /audit/logs, each ending in
+    # created_at so "newest first" is an index range scan rather than a sort.
+    __table_args__ = (
+        Index("ix_audit_actor_created", "actor_id", "created_at"),
+        Index("ix_audit_target_created", "target_user_id", "created_at"),
+        Index("ix_audit_event_created", "event_type", "created_at"),
+        {"extend_existing": True},
+    )
 
     id             = Column(String, primary_key=True)           # UUID
     actor_id       = Column(String, nullable=False)             # Who performed the action
@@ -144,3 +208,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """FastAPI dependency for an asyncio database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
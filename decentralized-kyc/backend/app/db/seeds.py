@@ -2,11 +2,15 @@ import uuid
 from sqlalchemy.orm import Session
 from app.db.database import User, UserRole
 from app.core.security import hash_password
+from app.core.config import get_settings
+
+settings = get_settings()
 
 def seed_data(db: Session):
     """Seed the database with a predefined bank user if it doesn't exist."""
     
-    # Check if the default bank already exists
+    # Check if the default bank already exists — on every restart after the
+    # first this is the only work done, so no bcrypt hash is ever computed
     bank_email = "admin@globalbank.com"
     existing_bank = db.query(User).filter(User.email == bank_email).first()
     
@@ -15,7 +19,8 @@ def seed_data(db: Session):
         default_bank = User(
             id=str(uuid.uuid4()),
             email=bank_email,
-            hashed_password=hash_password("BankAdmin123!"),
+            # Prefer a hash precomputed at deploy time — no bcrypt at runtime
+            hashed_password=settings.SEED_BANK_PASSWORD_HASH or hash_password("BankAdmin123!"),
             full_name="Global Bank Corp",
             role=UserRole.bank,
             wallet_address="0xDEMO_GLOBAL_BANK", # Matches our new regex
@@ -5,22 +5,48 @@ Role-Based Access Control (RBAC) FastAPI dependency.
 
 ZERO-TRUST DESIGN:
 - Every protected endpoint explicitly declares the roles it permits.
-- The token is re-validated on EVERY request (no session caching server-side).
+- The token is validated on every request; a verified signature is remembered
+  for at most 30s (keyed by the token's SHA-256, never the raw token) so bursts
+  of concurrent dashboard calls don't re-decode the same JWT. A cached entry
+  is never honoured past the token's own `exp` claim.
 - Role is embedded in the JWT at issuance and cannot be changed without re-login.
 - The dependency raises 401 for missing/invalid tokens and 403 for wrong role.
 """
 
+import time
+
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.core.security import decode_access_token
+from app.core.security import JWTError, decode_access_token, sha256_hex
 from app.db.database import get_db, User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# sha256(token)[:32] → (user_id, exp) for tokens whose signature was recently
+# verified. Only successfully decoded tokens are ever stored.
+_tok_cache = TTLCache(maxsize=10_000, ttl=30)
+
+
+# Built once at import: active user by id. The bound parameter keeps the
+# statement's cache key constant, so it is compiled once per process and
+# inactive users are filtered in SQL rather than after loading.
+_USER_STMT = select(User).where(User.id == bindparam("uid"), User.is_active.is_(True))
+
+
+def token_hash(token: str) -> str:
+    """Cache key for a bearer token. The raw token is never stored."""
+    return sha256_hex(token)[:32]
+
+
+def invalidate(token_hash: str) -> None:
+    """Drop a cached token (e.g. on logout) so the next request re-validates it."""
+    _tok_cache.pop(token_hash, None)
+
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
@@ -35,17 +61,32 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    key = token_hash(token)
+    cached = _tok_cache.get(key)
+    if cached is not None:
+        cached_id, exp = cached
+        if time.time() >= exp:
+            invalidate(key)
+            raise credentials_exc
+        user = db.scalars(_USER_STMT, {"uid": cached_id}).first()
+        if user is None:
+            invalidate(key)
+            raise credentials_exc
+        return user
+
     try:
         payload = decode_access_token(token)
         user_id: str = payload.get("sub")
-        if user_id is None:
+        exp = payload.get("exp")
+        if user_id is None or exp is None:
             raise credentials_exc
     except JWTError:
         raise credentials_exc
 
-    user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
+    user = db.scalars(_USER_STMT, {"uid": user_id}).first()
     if user is None:
         raise credentials_exc
+    _tok_cache[key] = (user.id, exp)
     return user
 
 
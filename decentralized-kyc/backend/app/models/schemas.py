@@ -5,12 +5,22 @@ Pydantic request/response models — the API contract layer.
 All inputs are validated here before reaching business logic.
 """
 
-from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, StringConstraints, field_validator
+from typing import Annotated, Optional, List
 from datetime import datetime
 from enum import Enum
 
 
+# ── Shared field types ────────────────────────────────────────────────────────
+# Declared once so every model reuses the same constraint (and its compiled
+# pattern) instead of repeating inline regexes. Pydantic-core matches them
+# with the linear-time Rust regex engine.
+# Any "0x…" address (dev wallets, demo accounts)
+WalletStr = Annotated[str, StringConstraints(pattern=r"^0x.*$")]
+# A real 20-byte hex address, or a seeded DEMO_ account
+StrictWalletStr = Annotated[str, StringConstraints(pattern=r"^0x([a-fA-F0-9]{40}|DEMO_.*)$")]
+
+
 # ── Enums ─────────────────────────────────────────────────────────────────────
 class UserRole(str, Enum):
     user = "user"
@@ -30,18 +40,25 @@ class UserCreate(BaseModel):
     password: str = Field(..., min_length=8, max_length=128)
     full_name: Optional[str] = Field(None, max_length=200)
     role: UserRole = UserRole.user
-    wallet_address: Optional[str] = Field(None, pattern=r"^0x.*$")
+    wallet_address: Optional[WalletStr] = None
     description: Optional[str] = Field(None, max_length=1000)
     services: Optional[str] = Field(None, max_length=500)
 
     @field_validator("password")
     @classmethod
     def password_strength(cls, v: str) -> str:
-        if not any(c.isupper() for c in v):
+        # Single pass, stopping as soon as both classes have been seen
+        has_upper = has_digit = False
+        for c in v:
+            if c.isupper():
+                has_upper = True
+            elif c.isdigit():
+                has_digit = True
+            if has_upper and has_digit:
+                return v
+        if not has_upper:
             raise ValueError("Password must contain at least one uppercase letter")
-        if not any(c.isdigit() for c in v):
-            raise ValueError("Password must contain at least one digit")
-        return v
+        raise ValueError("Password must contain at least one digit")
 
 
 class UserLogin(BaseModel):
@@ -60,7 +77,7 @@ class UserOut(BaseModel):
     is_active: bool
     created_at: datetime
 
-    model_config = {"from_attributes": True}
+    model_config = {"from_attributes": True, "extra": "ignore"}
 
 
 class Token(BaseModel):
@@ -100,17 +117,17 @@ class KYCStatus(BaseModel):
     liveness_score: Optional[int]
     liveness_verified: bool = False
 
-    model_config = {"from_attributes": True}
+    model_config = {"from_attributes": True, "extra": "ignore"}
 
 
 # ── Consent ───────────────────────────────────────────────────────────────────
 class AccessRequest(BaseModel):
-    user_wallet_address: str = Field(..., pattern=r"^0x.*$")
+    user_wallet_address: WalletStr
 
 
 class GrantConsentRequest(BaseModel):
     bank_id: str
-    bank_wallet_address: str = Field(..., pattern=r"^0x.*$")
+    bank_wallet_address: WalletStr
     # SECURITY:
     # The client signs the message  "GRANT_CONSENT:<bank_wallet>:<timestamp>"
     # using MetaMask / ethers.js.  Backend verifies this before calling the contract.
@@ -120,7 +137,7 @@ class GrantConsentRequest(BaseModel):
 
 class RevokeConsentRequest(BaseModel):
     bank_id: str
-    bank_wallet_address: str = Field(..., pattern=r"^0x([a-fA-F0-9]{40}|DEMO_.*)$")
+    bank_wallet_address: StrictWalletStr
     signature: str
     consent_message: str
 
@@ -139,7 +156,21 @@ class ConsentStatusOut(BaseModel):
     revoked_at: Optional[datetime]
     tx_hash: Optional[str]
 
-    model_config = {"from_attributes": True}
+    model_config = {"from_attributes": True, "extra": "ignore"}
+
+
+class PendingRequestOut(BaseModel):
+    consent_id: str
+    bank_id: Optional[str]
+    bank_name: Optional[str]
+    bank_email: Optional[str]
+    bank_wallet_address: Optional[str]
+    requested_at: Optional[datetime]
+    bank_decision: Optional[str]
+    rejection_reason: Optional[str]
+    doc_request_message: Optional[str]
+
+    model_config = {"from_attributes": True, "extra": "ignore"}
 
 
 # ── Audit ─────────────────────────────────────────────────────────────────────
@@ -153,12 +184,13 @@ class AuditLogOut(BaseModel):
     details: Optional[str]
     created_at: datetime
 
-    model_config = {"from_attributes": True}
+    model_config = {"from_attributes": True, "extra": "ignore"}
 
 
 class AuditLogList(BaseModel):
-    total: int
+    total: Optional[int] = None          # Only set when requested with ?with_total=true
     logs: List[AuditLogOut]
+    next_cursor: Optional[str] = None    # Keyset cursor for the next page; None on last page
 
 
 # ── Health ────────────────────────────────────────────────────────────────────
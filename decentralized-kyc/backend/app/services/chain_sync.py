@@ -0,0 +1,56 @@
+"""
+app/services/chain_sync.py
+───────────────────────────
+Out-of-band blockchain writes.
+
+Contract calls (Web3 RPC) take hundreds of ms to seconds and are already
+non-fatal, so endpoints commit their DB rows first and schedule the chain
+call as a FastAPI background task. Once the transaction is broadcast, the
+resulting tx_hash is written back onto the rows created by the request.
+
+NOTE: BackgroundTasks run in-process after the response is sent — a worker
+restart drops pending calls. For stronger durability swap this for a queue
+(RQ / Celery) consuming the same arguments.
+"""
+
+from typing import Callable, Optional
+
+from app.core.blockchain import blockchain_client
+from app.db.database import SessionLocal, AuditLog, ConsentRecord, KYCRecord
+
+
+def record_on_chain(
+    label: str,
+    send: Callable[[], str],
+    audit_log_id: str,
+    consent_id: Optional[str] = None,
+    kyc_id: Optional[str] = None,
+) -> None:
+    """
+    Broadcast a contract call and back-fill its tx_hash.
+
+    Args:
+        label:         Contract function name, used in log lines.
+        send:          Zero-arg callable performing the call; returns the tx hash.
+        audit_log_id:  AuditLog row to stamp with the tx hash.
+        consent_id:    Optional ConsentRecord row to stamp as well.
+        kyc_id:        Optional KYCRecord row to stamp as well.
+
+    Declared sync on purpose: Starlette runs sync background tasks in its
+    threadpool, so the blocking RPC never touches the event loop.
+    """
+    if not blockchain_client.is_connected():
+        return
+    try:
+        tx_hash = send()
+    except Exception as e:
+        print(f"[Blockchain] {label} warning: {e}")
+        return
+
+    with SessionLocal() as db:
+        db.query(AuditLog).filter(AuditLog.id == audit_log_id).update({"tx_hash": tx_hash})
+        if consent_id:
+            db.query(ConsentRecord).filter(ConsentRecord.id == consent_id).update({"tx_hash": tx_hash})
+        if kyc_id:
+            db.query(KYCRecord).filter(KYCRecord.id == kyc_id).update({"tx_hash": tx_hash})
+        db.commit()
@@ -0,0 +1,142 @@
+"""
+app/services/document_analysis.py
+──────────────────────────────────
+OpenCV-based photo ID quality analysis.
+
+Pure CPU work on already-decrypted plaintext — call it through
+asyncio.to_thread() from async handlers so the event loop stays free.
+"""
+
+import base64
+
+import cv2
+import numpy as np
+
+# Longest side of the copy used for ID-outline detection
+_CONTOUR_MAX_SIDE = 640
+
+
+def analyze_document(plaintext_bytes: bytes) -> dict:
+    """
+    Analyse a document image:
+      - Image dimensions & resolution quality
+      - Sharpness score (Laplacian variance)
+      - Brightness & contrast
+      - Detected rectangular ID region (MRZ-style contour check)
+      - Overall confidence score + small JPEG thumbnail
+
+    Returns:
+        {"format": "image" | "pdf", "analysis": {...}}
+    """
+    nparr = np.frombuffer(plaintext_bytes, np.uint8)
+    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if img is None:
+        # Likely a PDF — return basic metadata
+        return {
+            "format": "pdf",
+            "analysis": {
+                "format": "PDF",
+                "size_bytes": len(plaintext_bytes),
+                "sharpness": None,
+                "brightness": None,
+                "confidence": 70,
+                "status": "pdf_document",
+                "message": "PDF document detected — visual analysis skipped.",
+                "checks": {
+                    "readable": True,
+                    "proper_size": len(plaintext_bytes) > 5000,
+                }
+            }
+        }
+
+    h, w = img.shape[:2]
+
+    # ── Colour channels (detect greyscale / colour scan) ─────────────────────
+    # One pass over the pixels for all three channels, no float64 temporaries
+    b_mean, g_mean, r_mean = (int(m) for m in cv2.mean(img)[:3])
+    is_colour = not (abs(b_mean - g_mean) < 8 and abs(g_mean - r_mean) < 8)
+
+    # ── Thumbnail (small preview, base64) ────────────────────────────────────
+    thumb = cv2.resize(img, (240, int(240 * h / w)))
+    _, thumb_buf = cv2.imencode('.jpg', thumb, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    thumb_b64 = base64.b64encode(thumb_buf.tobytes()).decode()
+
+    # Everything below works on gray only — drop the 3× larger BGR image so
+    # the grey working set stays cache-resident through Laplacian/Canny.
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    del img
+
+    # ── Sharpness (Laplacian variance) ────────────────────────────────────────
+    # int16 holds the full uint8 Laplacian range (±1020) — no need for float64
+    laplacian_var = cv2.Laplacian(gray, cv2.CV_16S).var()
+    sharpness_score = min(100, int(laplacian_var / 5))
+
+    # ── Brightness & contrast (mean / std deviation of gray) ─────────────────
+    # One pass for both instead of separate np.mean + np.std walks
+    gray_mean, gray_std = cv2.meanStdDev(gray)
+    brightness = int(gray_mean[0][0])
+    contrast = int(gray_std[0][0])
+
+    # ── ID card contour detection (largest rectangle) ─────────────────────────
+    # Outline detection doesn't need native resolution: run Canny + contours
+    # on a downscaled copy. Area and aspect checks are scale-relative.
+    scale = min(1.0, _CONTOUR_MAX_SIDE / max(h, w))
+    small = (
+        cv2.resize(gray, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        if scale < 1.0 else gray
+    )
+    sh, sw = small.shape[:2]
+    edges = cv2.Canny(small, 50, 150)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    id_region_detected = False
+    id_aspect_ok = False
+    if contours:
+        largest = max(contours, key=cv2.contourArea)
+        area = cv2.contourArea(largest)
+        if area > (sh * sw * 0.1):   # at least 10% of image
+            x2, y2, rw, rh = cv2.boundingRect(largest)
+            aspect = rw / rh if rh > 0 else 0
+            id_region_detected = True
+            id_aspect_ok = 1.2 <= aspect <= 2.2   # typical ID card ratio
+
+    # ── Checks ────────────────────────────────────────────────────────────────
+    proper_size = w >= 400 and h >= 250
+    not_too_dark = brightness > 40
+    not_too_bright = brightness < 220
+    sharp_enough = sharpness_score >= 15
+
+    # ── Confidence score ──────────────────────────────────────────────────────
+    score = 40
+    if sharp_enough:      score += 20
+    if proper_size:       score += 15
+    if id_region_detected: score += 15
+    if id_aspect_ok:      score += 10
+    if not_too_dark and not_too_bright: score += 10
+    confidence = min(100, score)
+
+    return {
+        "format": "image",
+        "analysis": {
+            "width": w,
+            "height": h,
+            "format": "Image",
+            "size_bytes": len(plaintext_bytes),
+            "sharpness": sharpness_score,
+            "brightness": brightness,
+            "contrast": contrast,
+            "is_colour": is_colour,
+            "id_region_detected": id_region_detected,
+            "id_aspect_ratio_ok": id_aspect_ok,
+            "confidence": confidence,
+            "status": "pass" if confidence >= 60 else "warn" if confidence >= 40 else "fail",
+            "checks": {
+                "sharp_enough": sharp_enough,
+                "proper_size": proper_size,
+                "not_too_dark": not_too_dark,
+                "not_too_bright": not_too_bright,
+                "id_region_detected": id_region_detected,
+                "colour_scan": is_colour,
+            },
+            "thumbnail_b64": thumb_b64,
+        }
+    }
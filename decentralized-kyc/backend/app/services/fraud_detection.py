@@ -38,63 +38,154 @@ CURRENT MVP BEHAVIOR:
 """
 
 import hashlib
+import io
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, FrozenSet, Optional
 
+from app.core.config import get_settings
 
-async def scan_document(file_bytes: bytes, content_type: str) -> int:
-    """
-    Scan a document for potential fraud.
+settings = get_settings()
 
-    Args:
-        file_bytes:    Raw document bytes
-        content_type:  MIME type of the uploaded file
 
-    Returns:
-        Fraud score integer 0–100.
-        0  = definitely clean
-        100 = definitely fraudulent
-        Threshold: reject if score >= 80
+@dataclass(frozen=True)
+class ScanResult:
+    score: int                      # 0 = clean … 100 = fraudulent
+    sha256: Optional[bytes] = None  # Document digest; None if not computed
 
-    PRODUCTION REPLACEMENT:
-        Replace this function body with a real ML model call.
-        Keep the same signature so the kyc.py caller needs no changes.
+
+def _load_fraud_hashes() -> FrozenSet[bytes]:
     """
-    # ── Basic validation checks ───────────────────────────────────────────────
-    allowed_types = {
-        "image/jpeg", "image/png", "image/webp",
-        "application/pdf",
-    }
+    Raw SHA-256 digests of known fraudulent documents, read once at import
+    from FRAUD_HASHES_FILE (one hex digest per line, '#' comments allowed).
+    """
+    if not settings.FRAUD_HASHES_FILE:
+        return frozenset()
+    try:
+        lines = Path(settings.FRAUD_HASHES_FILE).read_text().splitlines()
+        hashes = frozenset(
+            bytes.fromhex(line) for line in (l.split("#", 1)[0].strip() for l in lines) if line
+        )
+        print(f"[Fraud] Loaded {len(hashes)} known fraudulent document hashes")
+        return hashes
+    except Exception as e:
+        print(f"[Fraud] Could not load {settings.FRAUD_HASHES_FILE}: {e}")
+        return frozenset()
+
+
+KNOWN_FRAUD_HASHES: FrozenSet[bytes] = _load_fraud_hashes()
+
+# Allowed MIME type → (offset, signature) pairs the file must carry
+_MAGIC_BYTES = {
+    "application/pdf": ((0, b"%PDF"),),
+    "image/jpeg":      ((0, b"\xff\xd8"),),
+    "image/png":       ((0, b"\x89PNG"),),
+    "image/webp":      ((0, b"RIFF"), (8, b"WEBP")),    # RIFF <size> WEBP
+}
+# Leading bytes read for the signature check (covers every offset above)
+_HEAD_SIZE = 12
+
+
+def prescreen_document(document: bytes | BinaryIO, content_type: str) -> Optional[int]:
+    """
+    The cheap fraud checks — declared type, size and magic bytes. They only
+    look at the header, so callers can run them before any upload work.
 
-    # Reject completely unknown file types
-    if content_type not in allowed_types:
+    Returns:
+        The fraud score if the document fails a check, None if it passes
+        (the digest check in score_digest then decides).
+    """
+    # ── Basic validation checks ───────────────────────────────────────────────
+    # Reject completely unknown file types (allowed = those with a signature)
+    signature = _MAGIC_BYTES.get(content_type)
+    if signature is None:
         return 70  # Medium-high risk — unknown format
 
+    if hasattr(document, "read"):
+        size = document.seek(0, io.SEEK_END)
+        document.seek(0)
+        head = document.read(_HEAD_SIZE)
+        document.seek(0)
+    else:
+        size = len(document)
+        head = bytes(document[:_HEAD_SIZE])
+
     # Reject suspiciously tiny files (< 10 KB) — likely screenshots/fakes
-    if len(file_bytes) < 10 * 1024:
+    if size < 10 * 1024:
         return 60
 
-    # ── Placeholder: check for duplicate document hash ────────────────────────
-    # In production, this would query a database of known fraudulent document hashes
-    doc_hash = hashlib.sha256(file_bytes).hexdigest()
-    # Known fraudulent hashes would be checked here:
-    # if doc_hash in KNOWN_FRAUD_HASHES:
-    #     return 95
-
     # ── Placeholder: structural analysis ─────────────────────────────────────
-    # PDF magic bytes check
-    if content_type == "application/pdf":
-        if not file_bytes.startswith(b"%PDF"):
-            return 75  # Not a real PDF
+    # Magic bytes must match the declared type. Checked before hashing so
+    # malformed / probing uploads never cost a full pass over the file.
+    if not all(head.startswith(magic, offset) for offset, magic in signature):
+        return 75  # Content doesn't match its declared type
+
+    return None
+
 
-    # JPEG magic bytes check
-    if content_type == "image/jpeg":
-        if not file_bytes[:2] == b"\xff\xd8":
-            return 75  # Not a real JPEG
+def score_digest(sha256: Optional[bytes]) -> int:
+    """Fraud score for a document that passed prescreen_document."""
+    # ── Known-fraud document hash ─────────────────────────────────────────────
+    if sha256 is not None and sha256 in KNOWN_FRAUD_HASHES:
+        return 95
 
     # ── Default: low risk (real AI model would replace this) ──────────────────
     # TODO: Replace with ML model inference
     return 5
 
 
+async def scan_document(
+    document: bytes | BinaryIO,
+    content_type: str,
+    sha256: Optional[bytes] = None,
+) -> ScanResult:
+    """
+    Scan a document for potential fraud — prescreen_document, then
+    score_digest. Callers that upload in between (kyc.py) use the two
+    stages directly so a flagged document is rejected before the upload.
+
+    Args:
+        document:      Raw document bytes (any bytes-like), or a seekable
+                       binary stream such as UploadFile.file — streams are
+                       hashed through hashlib.file_digest's fixed buffer
+                       instead of being read into memory, then rewound.
+        content_type:  MIME type of the uploaded file
+        sha256:        Document digest if the caller already has it (e.g.
+                       from IPFSClient.upload_encrypted_with_digest, which
+                       hashes during encryption) — skips the hashing pass.
+
+    Returns:
+        ScanResult — fraud score 0–100 plus the document's SHA-256 digest
+        (the caller's, or computed here only when KNOWN_FRAUD_HASHES is
+        non-empty; None otherwise).
+        0  = definitely clean
+        100 = definitely fraudulent
+        Threshold: reject if score >= 80
+
+    PRODUCTION REPLACEMENT:
+        Replace the stage bodies with a real ML model call.
+        Keep the same signatures so the kyc.py caller needs no changes.
+    """
+    score = prescreen_document(document, content_type)
+    if score is not None:
+        return ScanResult(score)
+
+    # hashlib's OpenSSL backend uses SHA-NI / ARMv8 SHA2 where available.
+    # Pay-as-you-go: with no known-fraud list loaded nothing would consume
+    # the digest, so a caller-supplied one is passed through and otherwise
+    # the hashing pass is skipped entirely.
+    if sha256 is not None:
+        doc_hash = sha256
+    elif not KNOWN_FRAUD_HASHES:
+        doc_hash = None
+    elif hasattr(document, "read"):
+        doc_hash = hashlib.file_digest(document, "sha256").digest()
+        document.seek(0)
+    else:
+        doc_hash = hashlib.sha256(document).digest()
+    return ScanResult(score_digest(doc_hash), doc_hash)
+
+
 async def check_deepfake(image_bytes: bytes) -> dict:
     """
     Deepfake detection placeholder for selfie liveness verification.
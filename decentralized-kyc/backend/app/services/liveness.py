@@ -3,139 +3,564 @@ app/services/liveness.py
 ────────────────────────
 CV-based liveness verification using OpenCV.
 Checks for face presence and features in a captured image.
+
+Face matching uses an ArcFace ONNX model (512-d embeddings) when
+FACE_MODEL_PATH is set and onnxruntime is installed. Without a model no
+embedding is stored and every match runs ORB against the ID document —
+raw-pixel vectors are not an identity descriptor and would accept impostors.
 """
 
 import cv2
 import numpy as np
-import base64
+import asyncio
+import os
+import threading
+import pybase64
+from typing import List, Optional
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Haar / ORB detection runs on grayscale capped at this long edge
+_DETECT_MAX_SIDE = 640
+
+# A data-URL header ("data:image/jpeg;base64,") always fits in this many chars
+_DATA_URL_PREFIX_MAX = 64
+
+# ArcFace: 112×112 RGB input, 512-d output; cosine > 0.35 ≈ same identity
+_ARCFACE_SIZE = (112, 112)
+_ARCFACE_DIM = 512
+_ARCFACE_MATCH_THRESHOLD = 0.35
+
+
+def _load_arcface():
+    """Load the optional ArcFace session; None if unconfigured or unavailable."""
+    if not settings.FACE_MODEL_PATH:
+        return None
+    try:
+        import onnxruntime as ort
+        session = ort.InferenceSession(settings.FACE_MODEL_PATH, providers=["CPUExecutionProvider"])
+        print(f"[Liveness] ArcFace model loaded from {settings.FACE_MODEL_PATH}")
+        return session
+    except Exception as e:
+        print(f"[Liveness] ArcFace unavailable ({e}), using ORB face matching")
+        return None
+
+
+_ARCFACE = _load_arcface()
+EMBEDDING_MODEL_LOADED = _ARCFACE is not None
+_ARCFACE_INPUT = _ARCFACE.get_inputs()[0].name if _ARCFACE is not None else None
+# Dynamic batch axis (symbolic / None) → one session.run per micro-batch
+_ARCFACE_BATCHED = _ARCFACE is not None and not isinstance(_ARCFACE.get_inputs()[0].shape[0], int)
+
+# Micro-batching window for concurrent /liveness embedding requests
+_BATCH_MAX_SIZE = 16
+_BATCH_MAX_WAIT = 0.01   # seconds
+
+# YuNet (cv2.FaceDetectorYN) face detector for liveness, when
+# FACE_DETECTOR_MODEL_PATH points at e.g. face_detection_yunet_2023mar_int8.onnx.
+# Frames are scaled so the longest side is 320 px before detection.
+_YUNET_INPUT_SIDE = 320
+_YUNET_SCORE_THRESHOLD = 0.6
+_YUNET_ENABLED = bool(settings.FACE_DETECTOR_MODEL_PATH) and hasattr(cv2, "FaceDetectorYN")
+if _YUNET_ENABLED and not os.path.exists(settings.FACE_DETECTOR_MODEL_PATH):
+    print(f"[Liveness] YuNet model not found at {settings.FACE_DETECTOR_MODEL_PATH}, using Haar cascades")
+    _YUNET_ENABLED = False
+_yunet_tls = threading.local()
+
+# Cascades are built once per worker thread (see _get_face_cascade /
+# _get_eye_cascade) — constructing one re-parses its XML from disk, and a
+# CascadeClassifier keeps per-call scratch state, so it must not be shared
+# across concurrent detectMultiScale calls.
+_HAAR_DIR = cv2.data.haarcascades
+_FACE_XML = _HAAR_DIR + 'haarcascade_frontalface_default.xml'
+_EYE_XML = _HAAR_DIR + 'haarcascade_eye.xml'
+_cascade_tls = threading.local()
+# Single-scale ORB: face ROIs are resized to _ORB_FACE_SIZE first, so the
+# 8-level scale pyramid buys nothing. Descriptors stay the standard 32 bytes.
+_ORB_FACE_SIZE = (256, 256)
+# One ORB per worker thread (see _get_orb) — OpenCV doesn't guarantee
+# Feature2D objects are safe to share across concurrent calls
+_orb_tls = threading.local()
+
+# Set-bit count of every byte value — Hamming distance by table lookup
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _decode_data_url(image_b64: str) -> bytes:
+    """
+    Raw bytes of a base64 payload, optionally wrapped as a data URL.
+    The single place base64 selfies are parsed and decoded.
+    """
+    # Strip a "data:image/...;base64," prefix with one find + slice — no
+    # split() list, and no copy at all when there's no prefix.
+    idx = image_b64.find(",", 0, _DATA_URL_PREFIX_MAX)
+    payload = image_b64[idx + 1:] if idx >= 0 else image_b64
+    # pybase64 decodes with SIMD (AVX2/SSSE3/NEON) — several times faster
+    # than the stdlib on multi-MB selfies
+    return pybase64.b64decode(payload, validate=False)
+
+
+def decode_image_b64(image_b64: str) -> Optional[np.ndarray]:
+    """
+    Decode a base64 image (optionally a data URL) to a BGR ndarray.
+    Returns None if it doesn't decode to an image. Callers that run several
+    checks on the same upload decode once and pass the array around.
+    """
+    try:
+        nparr = np.frombuffer(_decode_data_url(image_b64), np.uint8)
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    except Exception as e:
+        print(f"[Liveness] Decode Error: {e}")
+        return None
+
+
+def _yunet_detector():
+    """Per-thread YuNet detector — setInputSize() mutates it, so never share."""
+    detector = getattr(_yunet_tls, "detector", None)
+    if detector is None:
+        detector = _yunet_tls.detector = cv2.FaceDetectorYN.create(
+            settings.FACE_DETECTOR_MODEL_PATH, "",
+            (_YUNET_INPUT_SIDE, _YUNET_INPUT_SIDE), _YUNET_SCORE_THRESHOLD,
+        )
+    return detector
+
+
+def _verify_liveness_yunet(img: np.ndarray) -> (bool, int):
+    """
+    YuNet liveness scoring: one CNN pass returns box + 5 landmarks + confidence
+    per face. The detector's confidence stands in for the eye-cascade check.
+    """
+    h, w = img.shape[:2]
+    scale = _YUNET_INPUT_SIDE / max(h, w)
+    small = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+
+    detector = _yunet_detector()
+    detector.setInputSize((small.shape[1], small.shape[0]))
+    _, faces = detector.detect(small)
+    if faces is None or len(faces) == 0:
+        return False, 0
+
+    score = 50 # Base score for finding a face
+    img_area = small.shape[0] * small.shape[1]
+    for face in faces:
+        # Row: x, y, w, h, 5 × (landmark x, y), confidence
+        score += int(40 * float(face[14]))
+        if 0.1 < (face[2] * face[3] / img_area) < 0.6:
+            score += 10 # Good distance from camera
+
+    return score >= 60, min(score, 100)
 
-def verify_liveness(image_b64: str) -> (bool, int):
+
+def _get_face_cascade():
+    """This thread's frontal-face Haar cascade, loaded on first use."""
+    cascade = getattr(_cascade_tls, "face", None)
+    if cascade is None:
+        cascade = _cascade_tls.face = cv2.CascadeClassifier(_FACE_XML)
+    return cascade
+
+
+def _get_eye_cascade():
+    """This thread's eye Haar cascade, loaded on first use."""
+    cascade = getattr(_cascade_tls, "eye", None)
+    if cascade is None:
+        cascade = _cascade_tls.eye = cv2.CascadeClassifier(_EYE_XML)
+    return cascade
+
+
+def _get_orb():
+    """This thread's pre-built single-scale ORB detector."""
+    orb = getattr(_orb_tls, "orb", None)
+    if orb is None:
+        orb = _orb_tls.orb = cv2.ORB_create(
+            nfeatures=500, scaleFactor=1.2, nlevels=1, edgeThreshold=15, patchSize=31,
+        )
+    return orb
+
+
+def _largest_face(faces: np.ndarray) -> np.ndarray:
+    """(x, y, w, h) row of the largest-area box in a detectMultiScale result."""
+    faces = np.asarray(faces)
+    areas = faces[:, 2].astype(np.int32) * faces[:, 3].astype(np.int32)
+    return faces[int(areas.argmax())]
+
+
+def _detection_gray(img: np.ndarray) -> np.ndarray:
+    """Grayscale copy of `img` with the long edge capped at _DETECT_MAX_SIDE."""
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    scale = _DETECT_MAX_SIDE / max(gray.shape[:2])
+    if scale < 1.0:
+        gray = cv2.resize(gray, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def _decode_detection_gray(image_bytes: bytes) -> Optional[np.ndarray]:
+    """
+    Decode straight to grayscale at detection resolution. libjpeg does the
+    1/2 downscale in the DCT domain (IMREAD_REDUCED_GRAYSCALE_2), so a large
+    photo is never expanded to full-size BGR; small images that would drop
+    below _DETECT_MAX_SIDE are decoded at native size instead.
     """
-    Decodes a base64 image and runs face detection.
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    gray = cv2.imdecode(nparr, cv2.IMREAD_REDUCED_GRAYSCALE_2)
+    if gray is not None and max(gray.shape[:2]) < _DETECT_MAX_SIDE:
+        gray = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
+    return None if gray is None else _detection_gray(gray)
+
+
+def verify_liveness(image: str | np.ndarray) -> (bool, int):
+    """
+    Runs face detection on a base64 image or an already-decoded BGR image.
+    Uses YuNet when configured, otherwise Haar face + eye cascades.
     Returns: (is_valid, score)
     """
     try:
-        # 1. Decode base64
-        if "base64," in image_b64:
-            image_b64 = image_b64.split("base64,")[1]
-            
-        header, encoded = image_b64.split(",", 1) if "," in image_b64 else (None, image_b64)
-        img_data = base64.b64decode(encoded)
-        nparr = np.frombuffer(img_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # 1. Decode base64 (unless the caller already did)
+        img = decode_image_b64(image) if isinstance(image, str) else image
 
         if img is None:
             return False, 0
 
-        # 2. Convert to grayscale for detection
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        if _YUNET_ENABLED:
+            return _verify_liveness_yunet(img)
 
-        # 3. Load Haar Cascade for face detection
-        # Using the standard opencv data path
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+        # 2. Grayscale at detection resolution (≤ 640 px long edge)
+        gray = _detection_gray(img)
 
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+        # 3. Haar Cascade face detection (per-thread classifiers)
+        faces = _get_face_cascade().detectMultiScale(gray, 1.3, 5)
 
         if len(faces) == 0:
             return False, 0
 
-        # Basic scoring based on face size and presence of eyes
-        # (This is a simplified POC for "Liveness")
-        score = 50 # Base score for finding a face
-        
-        for (x, y, w, h) in faces:
-            roi_gray = gray[y:y+h, x:x+w]
-            eyes = eye_cascade.detectMultiScale(roi_gray)
-            
-            # If we find 2 eyes, it's a higher quality match
-            if len(eyes) >= 2:
-                score += 40
-            elif len(eyes) == 1:
-                score += 20
-                
-            # Check face size relative to image
-            face_area = w * h
-            img_area = img.shape[0] * img.shape[1]
-            if 0.1 < (face_area / img_area) < 0.6:
-                score += 10 # Good distance from camera
-
+        # Eye count per detected face (the only OpenCV work left per face)
+        eye_cascade = _get_eye_cascade()
+        eye_counts = np.array(
+            [len(eye_cascade.detectMultiScale(gray[y:y+h, x:x+w])) for (x, y, w, h) in faces]
+        )
+        score = _score_faces(np.asarray(faces), eye_counts, gray.shape[0] * gray.shape[1])
         return score >= 60, min(score, 100)
 
     except Exception as e:
         print(f"[Liveness] CV Error: {e}")
         return False, 0
 
-def compare_faces(live_image_b64: str, id_image_bytes: bytes) -> (bool, int):
+def compare_faces(live_image: str | np.ndarray, id_image_bytes: bytes) -> (bool, int):
     """
-    Compares a live selfie (base64) with a face in the ID document (bytes).
+    Compares a live selfie (base64 or decoded BGR image) with a face in the
+    ID document (bytes).
     Uses ORB feature matching and descriptor distance.
     Returns: (is_match, match_score)
     """
     try:
         # 1. Decode Live Image
-        if "base64," in live_image_b64:
-            live_image_b64 = live_image_b64.split("base64,")[1]
-        live_img_data = base64.b64decode(live_image_b64)
-        nparr1 = np.frombuffer(live_img_data, np.uint8)
-        live_img = cv2.imdecode(nparr1, cv2.IMREAD_COLOR)
+        live_img = decode_image_b64(live_image) if isinstance(live_image, str) else live_image
+        if live_img is None:
+            return False, 0
 
-        # 2. Decode ID Image
-        nparr2 = np.frombuffer(id_image_bytes, np.uint8)
-        id_img = cv2.imdecode(nparr2, cv2.IMREAD_COLOR)
+        # ArcFace available: one embedding per image + one dot product
+        if _ARCFACE is not None:
+            id_img = cv2.imdecode(np.frombuffer(id_image_bytes, np.uint8), cv2.IMREAD_COLOR)
+            live_emb, id_emb = _embed_image(live_img), _embed_image(id_img)
+            if live_emb is None or id_emb is None:
+                return False, 0
+            return _score_similarity(float(np.dot(live_emb, id_emb)))
 
-        if live_img is None or id_img is None:
+        # 2. Decode ID Image — ORB only needs grayscale at detection resolution
+        id_gray = _decode_detection_gray(id_image_bytes)
+        if id_gray is None:
             return False, 0
 
         # 3. Detect faces in both
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        
-        def get_face_roi(img):
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+        def get_face_roi(gray):
+            faces = _get_face_cascade().detectMultiScale(gray, 1.1, 4)
             if len(faces) == 0: return None
-            # Get largest face
-            (x, y, w, h) = sorted(faces, key=lambda f: f[2]*f[3], reverse=True)[0]
-            return gray[y:y+h, x:x+w]
+            # Get largest face, normalised to the ORB working scale
+            (x, y, w, h) = _largest_face(faces)
+            return cv2.resize(gray[y:y+h, x:x+w], _ORB_FACE_SIZE, interpolation=cv2.INTER_AREA)
 
-        live_face = get_face_roi(live_img)
-        id_face = get_face_roi(id_img)
+        live_face = get_face_roi(_detection_gray(live_img))
+        id_face = get_face_roi(id_gray)
 
         if live_face is None or id_face is None:
             return False, 0
 
         # 4. Feature Matching (ORB)
-        orb = cv2.ORB_create(nfeatures=500)
+        orb = _get_orb()
         kp1, des1 = orb.detectAndCompute(live_face, None)
         kp2, des2 = orb.detectAndCompute(id_face, None)
 
         if des1 is None or des2 is None:
             return False, 10 # Some base score for finding faces but no features
 
-        # Match descriptors
-        bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-        matches = bf.match(des1, des2)
-        
-        # Sort by distance
-        matches = sorted(matches, key=lambda x: x.distance)
-        
-        # Calculate score based on number of good matches
-        # and average distance
-        good_matches = [m for m in matches if m.distance < 50]
-        
-        match_count = len(good_matches)
-        if match_count == 0: return False, 0
-        
-        avg_dist = sum(m.distance for m in good_matches) / match_count
-        
-        # Scoring heuristic: 
-        # Higher match count + lower distance = higher score
-        score = min(100, int((match_count / 30) * 100))
-        # Penalty for high average distance
-        score = max(0, score - int(avg_dist / 2))
+        # Match descriptors (cross-checked nearest neighbours)
+        dists = _cross_check_distances(des1, des2)
 
+        score = _match_score(dists)
         return score > 40, score
 
     except Exception as e:
         print(f"[Face Match] Error: {e}")
         return False, 0
+
+
+def _score_faces(faces: np.ndarray, eye_counts: np.ndarray, img_area: int) -> int:
+    """
+    Haar liveness score over all detected faces, vectorised:
+    50 base for finding a face, per face +40 for two or more eyes / +20 for
+    one, and +10 when the face covers 10–60% of the frame (good distance).
+    (This is a simplified POC for "Liveness")
+    """
+    ratios = faces[:, 2] * faces[:, 3] / img_area
+    return int(
+        50
+        + 40 * np.count_nonzero(eye_counts >= 2)
+        + 20 * np.count_nonzero(eye_counts == 1)
+        + 10 * np.count_nonzero((ratios > 0.1) & (ratios < 0.6))
+    )
+
+
+def _match_score(dists: np.ndarray) -> int:
+    """
+    ORB match score from cross-checked Hamming distances: good matches
+    (< 50) scale the score up, their average distance pulls it down.
+    """
+    good = dists[dists < 50]
+    match_count = int(good.size)
+    if match_count == 0:
+        return 0
+
+    # Higher match count + lower distance = higher score
+    score = min(100, int((match_count / 30) * 100))
+    # Penalty for high average distance
+    return max(0, score - int(float(good.mean()) / 2))
+
+
+def _hamming_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """N×M Hamming distances between two sets of binary uint8 descriptors (ORB: 32 B)."""
+    return _POPCOUNT[np.bitwise_xor(a[:, None, :], b[None, :, :])].sum(axis=2, dtype=np.int32)
+
+
+def _cross_check_distances(des1: np.ndarray, des2: np.ndarray) -> np.ndarray:
+    """
+    Distances of mutual nearest-neighbour descriptor pairs — what
+    BFMatcher(NORM_HAMMING, crossCheck=True).match() keeps — computed from
+    one vectorised distance matrix, without building DMatch objects.
+    """
+    d = _hamming_matrix(des1, des2)
+    fwd = d.argmin(axis=1)                    # best des2 index per des1 row
+    back = d.argmin(axis=0)                   # best des1 index per des2 column
+    mutual = np.nonzero(back[fwd] == np.arange(len(fwd)))[0]
+    return d[mutual, fwd[mutual]]
+
+
+def extract_embedding(image_bytes: bytes) -> Optional[np.ndarray]:
+    """
+    Compute an ArcFace face embedding from an image (e.g. the uploaded ID).
+    Returns None if no embedding model is loaded, the bytes don't decode to
+    an image, or they contain no face.
+    """
+    if _ARCFACE is None:
+        return None
+    try:
+        nparr = np.frombuffer(image_bytes, np.uint8)
+        return _embed_image(cv2.imdecode(nparr, cv2.IMREAD_COLOR))
+
+    except Exception as e:
+        print(f"[Face Embedding] Error: {e}")
+        return None
+
+
+def has_face_embedding(stored_embedding: Optional[bytes]) -> bool:
+    """True if `stored_embedding` is an ArcFace vector this process can match against."""
+    return _ARCFACE is not None and bool(stored_embedding) and len(stored_embedding) == _ARCFACE_DIM * 4
+
+
+def _embed_image(img: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """
+    Embed the largest Haar-detected face with ArcFace as an L2-normalised
+    float32 vector, so two embeddings compare with a single dot product
+    (cosine similarity). None without a loaded model.
+    """
+    return _embed_batch([img])[0]
+
+
+def _embed_batch(images: List[Optional[np.ndarray]]) -> List[Optional[np.ndarray]]:
+    """
+    Batched _embed_image: every face crop in `images` is stacked into one
+    NCHW tensor and embedded with a single session.run.
+    """
+    results: List[Optional[np.ndarray]] = [None] * len(images)
+    if _ARCFACE is None:
+        return results
+    arc_idx, arc_faces = [], []
+
+    for i, img in enumerate(images):
+        if img is None:
+            continue
+
+        # Haar stays as the cheap face pre-filter / cropper
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        faces = _get_face_cascade().detectMultiScale(gray, 1.1, 4)
+        if len(faces) == 0:
+            continue
+        (x, y, w, h) = _largest_face(faces)
+
+        face = cv2.resize(img[y:y+h, x:x+w], _ARCFACE_SIZE, interpolation=cv2.INTER_AREA)
+        face = cv2.cvtColor(face, cv2.COLOR_BGR2RGB).astype(np.float32)
+        arc_idx.append(i)
+        arc_faces.append(((face - 127.5) / 127.5).transpose(2, 0, 1))   # CHW
+
+    if arc_faces:
+        batch = np.stack(arc_faces)                                   # NCHW
+        if _ARCFACE_BATCHED:
+            vecs = _ARCFACE.run(None, {_ARCFACE_INPUT: batch})[0]
+        else:
+            # Model exported with a fixed batch of 1
+            vecs = [_ARCFACE.run(None, {_ARCFACE_INPUT: f[np.newaxis]})[0][0] for f in batch]
+        for i, vec in zip(arc_idx, vecs):
+            results[i] = _l2_normalise(np.asarray(vec, dtype=np.float32))
+
+    return results
+
+
+def _l2_normalise(vec: np.ndarray) -> Optional[np.ndarray]:
+    norm = np.linalg.norm(vec)
+    if norm == 0:
+        return None
+    return vec / norm
+
+
+def _score_similarity(similarity: float) -> (bool, int):
+    """
+    Map ArcFace cosine similarity to (is_match, 0–100 score). The match
+    threshold lands at score 40, the same point as the ORB scale.
+    """
+    score = max(0, min(100, int(similarity / _ARCFACE_MATCH_THRESHOLD * 40)))
+    return similarity > _ARCFACE_MATCH_THRESHOLD, score
+
+
+def compare_embedding(live_image: str | np.ndarray, stored_embedding: bytes) -> (bool, int):
+    """
+    Compares a live selfie (base64 or decoded BGR image) against the ArcFace
+    embedding stored at upload.
+    Avoids fetching and decrypting the ID document on every liveness call.
+    Callers check has_face_embedding() first and otherwise use compare_faces.
+    Returns: (is_match, match_score)
+    """
+    try:
+        if not has_face_embedding(stored_embedding):
+            return False, 0
+        live_img = decode_image_b64(live_image) if isinstance(live_image, str) else live_image
+        live_emb = _embed_image(live_img)
+        if live_emb is None:
+            return False, 0
+
+        # Both vectors are unit-length, so the dot product is the cosine similarity
+        stored = np.frombuffer(stored_embedding, dtype=np.float32)
+        return _score_similarity(float(np.dot(live_emb, stored)))
+
+    except Exception as e:
+        print(f"[Face Match] Error: {e}")
+        return False, 0
+
+
+# ── Async wrappers ───────────────────────────────────────────────────────────
+# OpenCV releases the GIL for decode/detect/resize, so running these on the
+# default executor (sized in the app lifespan) keeps the event loop free and
+# lets concurrent requests use every core.
+async def decode_image_b64_async(image_b64: str) -> Optional[np.ndarray]:
+    return await asyncio.to_thread(decode_image_b64, image_b64)
+
+
+async def verify_liveness_async(image: str | np.ndarray) -> (bool, int):
+    return await asyncio.to_thread(verify_liveness, image)
+
+
+async def compare_faces_async(live_image: str | np.ndarray, id_image_bytes: bytes) -> (bool, int):
+    return await asyncio.to_thread(compare_faces, live_image, id_image_bytes)
+
+
+# ── Micro-batched embedding ──────────────────────────────────────────────────
+class _EmbeddingBatcher:
+    """
+    Collects concurrent embedding requests for up to _BATCH_MAX_WAIT (or
+    _BATCH_MAX_SIZE items) and embeds them with one worker-thread call,
+    so ArcFace runs once per batch instead of once per request.
+    Only active with an ArcFace model loaded — otherwise embed() returns
+    None immediately and no queue or worker is ever started.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def embed(self, img: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if _ARCFACE is None or img is None:
+            return None
+        # Queue + worker are created lazily so they bind to the running loop
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((img, fut))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + _BATCH_MAX_WAIT
+            while len(batch) < _BATCH_MAX_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await asyncio.to_thread(_embed_batch, [img for img, _ in batch])
+            except Exception as e:
+                print(f"[Face Embedding] Batch error: {e}")
+                results = [None] * len(batch)
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+
+    async def close(self) -> None:
+        """Stop the worker. Called from the app lifespan on shutdown."""
+        if self._task is not None:
+            self._task.cancel()
+        self._task = None
+
+
+_embedding_batcher = _EmbeddingBatcher()
+
+
+async def compare_embedding_async(live_image: str | np.ndarray, stored_embedding: bytes) -> (bool, int):
+    """
+    compare_embedding for async handlers: the selfie is embedded through the
+    shared micro-batcher, off the event loop. Returns (False, 0) unless an
+    ArcFace model is loaded and the stored vector is one of its embeddings.
+    """
+    try:
+        if not has_face_embedding(stored_embedding):
+            return False, 0
+        live_img = decode_image_b64(live_image) if isinstance(live_image, str) else live_image
+        live_emb = await _embedding_batcher.embed(live_img)
+        if live_emb is None:
+            return False, 0
+
+        stored = np.frombuffer(stored_embedding, dtype=np.float32)
+        return _score_similarity(float(np.dot(live_emb, stored)))
+
+    except Exception as e:
+        print(f"[Face Match] Error: {e}")
+        return False, 0
+
+
+async def close_embedding_batcher() -> None:
+    await _embedding_batcher.close()
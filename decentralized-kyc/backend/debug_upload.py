@@ -46,8 +46,12 @@ async def test_upload():
         settings = get_settings()
         
         print("[Debug] Step 1: Scanning document...")
-        fraud_score = await scan_document(content, "image/jpeg")
+        # Hash straight from the upload stream, as a spooled UploadFile would be
+        scan = await scan_document(file.file, "image/jpeg")
+        fraud_score = scan.score
         print(f"[Debug] Fraud Score: {fraud_score}")
+        if scan.sha256 is not None:
+            print(f"[Debug] Document SHA-256: {scan.sha256.hex()}")
 
         print("[Debug] Step 2: Uploading to IPFS (Mock)...")
         ipfs_cid = await ipfs_client.upload_encrypted(content)
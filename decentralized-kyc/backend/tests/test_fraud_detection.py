@@ -0,0 +1,66 @@
+"""
+Signature checks in app/services/fraud_detection.py — a file whose magic
+bytes don't match its declared type scores 75 and is never hashed.
+Run from backend/:  pip install -r requirements-dev.txt && python -m pytest
+"""
+
+import asyncio
+import io
+
+import pytest
+
+from app.services import fraud_detection
+from app.services.fraud_detection import prescreen_document, scan_document
+
+_PADDING = b"\0" * (20 * 1024)   # clears the < 10 KB size check
+
+PNG = b"\x89PNG\r\n\x1a\n" + _PADDING
+WEBP = b"RIFF\x00\x50\x00\x00WEBPVP8 " + _PADDING
+JPEG = b"\xff\xd8\xff\xe0" + _PADDING
+
+
+@pytest.fixture
+def fraud_list(monkeypatch):
+    """Load a known-fraud list so scan_document would hash a clean document."""
+    monkeypatch.setattr(fraud_detection, "KNOWN_FRAUD_HASHES", frozenset({b"\0" * 32}))
+
+
+@pytest.mark.parametrize("content_type, document", [
+    ("image/png", PNG),
+    ("image/webp", WEBP),
+    ("image/jpeg", JPEG),
+])
+def test_matching_signature_passes(content_type, document):
+    assert prescreen_document(document, content_type) is None
+
+
+@pytest.mark.parametrize("content_type, document", [
+    ("image/png", JPEG),
+    ("image/webp", PNG),
+    ("image/webp", b"RIFF\x00\x50\x00\x00WAVEfmt " + _PADDING),   # RIFF, but not WebP
+])
+def test_mislabelled_image_scores_75(content_type, document):
+    assert prescreen_document(document, content_type) == 75
+    assert prescreen_document(io.BytesIO(document), content_type) == 75
+
+
+@pytest.mark.parametrize("content_type, document", [
+    ("image/png", JPEG),
+    ("image/webp", PNG),
+])
+def test_mislabelled_image_is_not_hashed(fraud_list, monkeypatch, content_type, document):
+    def no_hashing(*args, **kwargs):
+        raise AssertionError("mislabelled document was hashed")
+
+    monkeypatch.setattr(fraud_detection.hashlib, "sha256", no_hashing)
+    monkeypatch.setattr(fraud_detection.hashlib, "file_digest", no_hashing)
+
+    result = asyncio.run(scan_document(document, content_type))
+    assert result.score == 75
+    assert result.sha256 is None
+
+
+def test_clean_image_is_hashed(fraud_list):
+    result = asyncio.run(scan_document(PNG, "image/png"))
+    assert result.score == 5
+    assert result.sha256 is not None
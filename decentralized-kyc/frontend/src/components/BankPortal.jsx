@@ -54,15 +54,22 @@ function DetailPanel({ consentId, onClose }) {
         } finally { setRejecting(false); }
     };
 
+    // Release the document's object URL when it is replaced or on unmount
+    useEffect(() => () => { if (docData) URL.revokeObjectURL(docData.url); }, [docData]);
+
     const handleViewDocument = async () => {
         if (docData) { setDocData(null); return; } // toggle off
         setDocLoading(true);
         try {
+            // Raw document bytes (no base64) — rendered through an object URL
             const res = await kycService.viewDocument(consentId);
-            setDocData(res.data);
+            setDocData({ url: URL.createObjectURL(res.data), isPdf: res.data.type === 'application/pdf' });
             toast.success('Document loaded ✅');
         } catch (err) {
-            toast.error(err.response?.data?.detail || 'Failed to load document');
+            // Error bodies arrive as a Blob because of responseType: 'blob'
+            let detail;
+            try { detail = JSON.parse(await err.response?.data?.text())?.detail; } catch { /* not JSON */ }
+            toast.error(detail || 'Failed to load document');
         } finally { setDocLoading(false); }
     };
 
@@ -148,21 +155,21 @@ function DetailPanel({ consentId, onClose }) {
                     {docData && (
                         <div style={{ marginTop: '1rem', padding: '1rem', borderRadius: '12px', background: 'rgba(0,0,0,0.35)', border: '1px solid rgba(255,255,255,0.1)' }}>
                             <p style={{ fontSize: '0.7rem', color: 'var(--text-muted)', textTransform: 'uppercase', marginBottom: '0.75rem' }}>
-                                📎 {docData.doc_type?.toUpperCase()} — Uploaded {docData.uploaded_at ? new Date(docData.uploaded_at).toLocaleDateString() : 'N/A'}
+                                📎 {kyc.doc_type?.toUpperCase()} — Uploaded {kyc.uploaded_at ? new Date(kyc.uploaded_at).toLocaleDateString() : 'N/A'}
                             </p>
-                            <img
-                                src={`data:image/jpeg;base64,${docData.doc_b64}`}
-                                alt="KYC Document"
-                                style={{ width: '100%', borderRadius: '8px', maxHeight: '400px', objectFit: 'contain', background: '#fff' }}
-                                onError={(e) => {
-                                    // Fallback for PDFs: render as PDF embed
-                                    e.target.style.display = 'none';
-                                    const embed = document.createElement('embed');
-                                    embed.src = `data:application/pdf;base64,${docData.doc_b64}`;
-                                    embed.style = 'width:100%;height:400px;border-radius:8px;';
-                                    e.target.parentNode.appendChild(embed);
-                                }}
-                            />
+                            {docData.isPdf ? (
+                                <embed
+                                    src={docData.url}
+                                    type="application/pdf"
+                                    style={{ width: '100%', height: '400px', borderRadius: '8px' }}
+                                />
+                            ) : (
+                                <img
+                                    src={docData.url}
+                                    alt="KYC Document"
+                                    style={{ width: '100%', borderRadius: '8px', maxHeight: '400px', objectFit: 'contain', background: '#fff' }}
+                                />
+                            )}
                         </div>
                     )}
                 </div>
@@ -56,7 +56,7 @@ export const kycService = {
     checkLiveness: (imageB64) => api.post('/kyc/liveness', { image_b64: imageB64 }),
     verifyKyc: (consentId) => api.post(`/kyc/verify/${consentId}`),
     rejectKyc: (consentId, reason) => api.post(`/kyc/reject/${consentId}`, null, { params: { reason } }),
-    viewDocument: (consentId) => api.get(`/kyc/view-document/${consentId}`),
+    viewDocument: (consentId) => api.get(`/kyc/view-document/${consentId}`, { responseType: 'blob' }),
     requestMoreDocs: (consentId, message) => api.post(`/kyc/request-more-docs/${consentId}`, null, { params: { message } }),
     identifyDocument: () => api.get('/kyc/identify'),
 };
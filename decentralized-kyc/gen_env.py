@@ -1,7 +1,9 @@
-import secrets
+import os
 
-jwt_key = secrets.token_hex(32)
-aes_key = secrets.token_hex(32)
+# 256-bit keys straight from the OS CSPRNG (getrandom(2) / /dev/urandom —
+# the same source secrets.token_hex uses), hex-encoded once via bytes.hex()
+jwt_key = os.urandom(32).hex()
+aes_key = os.urandom(32).hex()
 
 # Hardhat account #0 private key (well-known test key, safe for local dev only)
 deployer_key = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"